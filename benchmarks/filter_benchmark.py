@@ -0,0 +1,104 @@
+# Benchmark for the College Filter & Map categorical filters.
+# Compares the original pandas filter (df.copy() + one isin() per column) against the bitmap CategoricalIndex,
+# on the cutoff table and on copies of it tiled 10x and 100x, and checks that both return the same rows.
+#
+# Usage (from the project root):
+#   python -m benchmarks.filter_benchmark
+#   python -m benchmarks.filter_benchmark --scales 1 10 100 --repeat 20
+#
+# The cutoff CSV is used when present in data/; otherwise a table with the same columns is synthesised from the
+# programs in josaa_branchwise_info_viz.csv (program x seat type x gender, as in the JoSAA opening/closing rank data).
+
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from src.cutoff_index import CategoricalIndex, INDEXED_COLUMNS
+from src.data_store import load_dataset, csv_path
+
+SEAT_TYPES = ['OPEN', 'OPEN (PwD)', 'EWS', 'EWS (PwD)', 'OBC-NCL', 'OBC-NCL (PwD)', 'SC', 'SC (PwD)', 'ST', 'ST (PwD)']
+GENDERS = ['Gender-Neutral', 'Female-only (including Supernumerary)']
+QUOTAS = ['AI', 'HS', 'OS']
+
+def load_table(seed=0):
+    if os.path.exists(csv_path('cutoffs')):
+        return load_dataset('cutoffs'), 'cutoff CSV'
+
+    rng = np.random.default_rng(seed)
+    programs = load_dataset('branchwise').rename(columns={'College Name': 'Institute'})
+    programs = programs[['Institute', 'College Category', 'Degree', 'Branch Cluster', 'Branch Name']]
+    rows = programs.merge(pd.DataFrame({'Seat Type': SEAT_TYPES}), how='cross')
+    rows = rows.merge(pd.DataFrame({'Gender': GENDERS}), how='cross')
+    rows['Quota'] = rng.choice(QUOTAS, size=len(rows), p=[0.5, 0.25, 0.25])
+    return rows, 'synthesised from josaa_branchwise_info_viz.csv'
+
+def pandas_filter(df, selections):
+    """The filter as module_3.filter_data implemented it before the index."""
+    filtered_df = df.copy()
+    for column, values in selections.items():
+        if values is not None and 'All' not in values:
+            filtered_df = filtered_df[filtered_df[column].isin(values)]
+    return filtered_df
+
+def sample_queries(df, count, seed=0):
+    """Filter combinations like the page produces: a few columns narrowed, the rest left at 'All'."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(count):
+        selections = {column: ['All'] for column in INDEXED_COLUMNS}
+        row = df.iloc[rng.integers(len(df))]
+        for column in rng.choice(INDEXED_COLUMNS, size=rng.integers(1, 4), replace=False):
+            others = df[column].drop_duplicates().sample(n=2, random_state=int(rng.integers(1 << 31))).tolist()
+            selections[column] = [row[column]] + others
+        queries.append(selections)
+    return queries
+
+def time_calls(fn, queries, repeat):
+    """Median milliseconds per query over `repeat` passes."""
+    samples = []
+    for _ in range(repeat):
+        for selections in queries:
+            start = time.perf_counter()
+            fn(selections)
+            samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+def run_benchmark(base_df, scales, num_queries=20, repeat=5):
+    queries = sample_queries(base_df, num_queries)
+    results = []
+    for scale in scales:
+        df = pd.concat([base_df] * scale, ignore_index=True)
+
+        start = time.perf_counter()
+        index = CategoricalIndex(df)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        for selections in queries:
+            expected = pandas_filter(df, selections).index.to_numpy()
+            if not np.array_equal(index.filter_rows(selections), expected):
+                raise AssertionError(f"index and pandas filters disagree at {scale}x for {selections}")
+
+        pandas_ms = time_calls(lambda selections: pandas_filter(df, selections), queries, repeat)
+        rows_ms = time_calls(index.filter_rows, queries, repeat)
+        index_ms = time_calls(lambda selections: df.iloc[index.filter_rows(selections)], queries, repeat)
+        results.append({"scale": scale, "rows": len(df), "build_ms": build_ms, "pandas_ms": pandas_ms,
+                        "rows_ms": rows_ms, "index_ms": index_ms, "speedup": pandas_ms / index_ms})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the College Filter & Map categorical filters.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="row-count multipliers")
+    parser.add_argument("--queries", type=int, default=20, help="filter combinations per scale")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the queries")
+    args = parser.parse_args()
+
+    base_df, source = load_table()
+    print(f"table: {len(base_df)} rows ({source})")
+    # row ids ms: bitmap filter alone; index ms: row ids plus the df.iloc take that filter_data returns
+    print(f"{'scale':>6} {'rows':>10} {'build ms':>10} {'pandas ms':>10} {'row ids ms':>10} {'index ms':>10} {'speedup':>8}")
+    for result in run_benchmark(base_df, args.scales, num_queries=args.queries, repeat=args.repeat):
+        print(f"{result['scale']:>5}x {result['rows']:>10} {result['build_ms']:>10.1f} {result['pandas_ms']:>10.2f} "
+              f"{result['rows_ms']:>10.2f} {result['index_ms']:>10.2f} {result['speedup']:>7.1f}x")
@@ -0,0 +1,142 @@
+# Offline benchmark for the JEE Docs Chat pipeline.
+# Runs the compiled LangGraph workflow over a gold question set with the deterministic LocalStandInLLM instead of
+# Groq, and reports per-node wall time, LLM calls per question, retrieval recall@k and end-to-end p50/p95.
+#
+# Usage (from the project root, with vector_db/ in place):
+#   python -m benchmarks.rag_benchmark --latency 0.2 --json bench.json
+#   python -m benchmarks.rag_benchmark --latency 0.2 --baseline bench.json    # exit code 1 on regression
+
+from langchain_core.messages import HumanMessage
+
+from collections import defaultdict
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import uuid
+import numpy as np
+
+from src.jee_docs_engine import JEEDocsEngine, load_retriever, VECTOR_DB
+from src.local_llm import LocalStandInLLM
+from src.semantic_cache import SemanticCache
+
+GOLD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gold_questions.json')
+
+# metric -> True if higher is better; used for the baseline comparison
+TRACKED_METRICS = {"p50_s": False, "p95_s": False, "llm_calls_per_question": False, "recall_at_k": True}
+
+def relevant_documents(docstore, keywords):
+    """Parent documents that mention any of the gold keywords (case-insensitive)."""
+    keywords = [keyword.lower() for keyword in keywords]
+    doc_ids = list(docstore.yield_keys())
+    return {str(doc) for doc in docstore.mget(doc_ids) if doc is not None and any(k in str(doc).lower() for k in keywords)}
+
+def run_question(engine, llm, question):
+    """Run one question through the graph; returns (seconds per node, total seconds, LLM calls)."""
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    calls_before = llm.calls
+    node_seconds = defaultdict(float)
+    start = last = time.perf_counter()
+    # "updates" yields once per finished node, so the gap since the previous update is that node's wall time
+    for update in engine.graph.stream(input={"question": HumanMessage(content=question)}, config=config, stream_mode="updates"):
+        now = time.perf_counter()
+        for node in update:
+            node_seconds[node] += now - last
+        last = now
+    return node_seconds, last - start, llm.calls - calls_before
+
+def run_benchmark(gold, retriever, latency=0.0, repeat=1, with_cache=False, verbose=False):
+    llm = LocalStandInLLM(latency=latency)
+    answer_cache = SemanticCache(retriever.vectorstore.embeddings.embed_query) if with_cache else None
+    engine = JEEDocsEngine(llm, retriever, answer_cache=answer_cache)
+
+    relevant_sets = [relevant_documents(retriever.docstore, item["relevant"]) for item in gold]
+
+    totals, llm_calls, recalls, hits = [], [], [], []
+    node_seconds = defaultdict(list)
+    for _ in range(repeat):
+        for item, relevant in zip(gold, relevant_sets):
+            retrieved = {str(doc) for doc in retriever.invoke(item["question"])}
+            if relevant:
+                recalls.append(len(retrieved & relevant) / len(relevant))
+                hits.append(1.0 if retrieved & relevant else 0.0)
+
+            # The nodes log every step with print(); keep the report readable unless asked for
+            with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+                per_node, total, calls = run_question(engine, llm, item["question"])
+            totals.append(total)
+            llm_calls.append(calls)
+            for node, seconds in per_node.items():
+                node_seconds[node].append(seconds)
+
+    return {
+        "questions": len(totals),
+        "llm_latency_s": latency,
+        "p50_s": float(np.percentile(totals, 50)),
+        "p95_s": float(np.percentile(totals, 95)),
+        "llm_calls_per_question": float(np.mean(llm_calls)),
+        "recall_at_k": float(np.mean(recalls)) if recalls else None,
+        "hit_at_k": float(np.mean(hits)) if hits else None,
+        "node_mean_s": {node: float(np.mean(seconds)) for node, seconds in node_seconds.items()},
+        "node_calls": {node: len(seconds) for node, seconds in node_seconds.items()},
+        "engine_counters": engine.stats(),
+    }
+
+def print_report(report):
+    print(f"questions:               {report['questions']}  (stand-in LLM latency {report['llm_latency_s']:.3f}s)")
+    print(f"end-to-end p50 / p95:    {report['p50_s']:.3f}s / {report['p95_s']:.3f}s")
+    print(f"LLM calls per question:  {report['llm_calls_per_question']:.2f}")
+    if report["recall_at_k"] is not None:
+        print(f"recall@k / hit@k:        {report['recall_at_k']:.3f} / {report['hit_at_k']:.3f}")
+    print("per-node mean wall time:")
+    for node, seconds in sorted(report["node_mean_s"].items(), key=lambda item: -item[1]):
+        print(f"  {node:<22} {seconds * 1000:9.1f} ms  x{report['node_calls'][node]}")
+
+def find_regressions(report, baseline, tolerance):
+    regressions = []
+    for metric, higher_is_better in TRACKED_METRICS.items():
+        new, old = report.get(metric), baseline.get(metric)
+        if new is None or old is None:
+            continue
+        worse = new < old * (1 - tolerance) if higher_is_better else new > old * (1 + tolerance)
+        if worse:
+            regressions.append(f"{metric}: {old:.3f} -> {new:.3f}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the JEE Docs Chat graph offline with a stand-in LLM.")
+    parser.add_argument("--gold", default=GOLD_FILE, help="gold question set (JSON)")
+    parser.add_argument("--vector-db", default=VECTOR_DB)
+    parser.add_argument("--storage", default="memory", choices=["memory", "disk"])
+    parser.add_argument("--retrieval", default="hybrid", choices=["hybrid", "vector"])
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per stand-in LLM call")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the gold set")
+    parser.add_argument("--with-cache", action="store_true", help="enable the semantic answer cache")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own logging")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="earlier --json report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression vs the baseline")
+    args = parser.parse_args()
+
+    with open(args.gold, "r") as f:
+        gold = json.load(f)
+    retriever = load_retriever(args.vector_db, storage=args.storage, retrieval=args.retrieval)
+    report = run_benchmark(gold, retriever, latency=args.latency, repeat=args.repeat,
+                           with_cache=args.with_cache, verbose=args.verbose)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = find_regressions(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
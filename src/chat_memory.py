@@ -0,0 +1,72 @@
+# Persistent, bounded conversation memory for JEE Docs Chat.
+# Conversations are checkpointed to a local SQLite file instead of process memory, threads that have been idle
+# for longer than a TTL are deleted, and only the latest checkpoint of each thread is kept.
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+import sqlite3
+import threading
+import time
+
+def open_checkpointer(path):
+    """SqliteSaver on a connection shared by all sessions (the saver serialises access with its own lock)."""
+    checkpointer = SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+    checkpointer.setup()
+    return checkpointer
+
+
+class ThreadExpiry:
+    """
+    Tracks when each thread was last used and periodically removes threads idle for more than `ttl` seconds.
+    A sweep runs at most every `sweep_interval` seconds, piggybacking on touch().
+    """
+
+    def __init__(self, checkpointer, ttl, sweep_interval=10 * 60):
+        self.checkpointer = checkpointer
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        with self.checkpointer.cursor() as cur:
+            cur.execute("CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, last_seen REAL NOT NULL)")
+
+    def touch(self, thread_id):
+        now = time.time()
+        with self.checkpointer.cursor() as cur:
+            cur.execute(
+                "INSERT INTO thread_activity (thread_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (thread_id, now),
+            )
+        with self._lock:
+            due = now - self._last_sweep >= self.sweep_interval
+            if due:
+                self._last_sweep = now
+        if due:
+            self.sweep(now)
+
+    def sweep(self, now=None):
+        """Delete expired threads and older checkpoints of live ones; returns the number of threads deleted."""
+        cutoff = (now if now is not None else time.time()) - self.ttl
+        with self.checkpointer.cursor() as cur:
+            cur.execute("SELECT thread_id FROM thread_activity WHERE last_seen < ?", (cutoff,))
+            expired = [thread_id for (thread_id,) in cur.fetchall()]
+        for thread_id in expired:
+            self.checkpointer.delete_thread(thread_id)
+        with self.checkpointer.cursor() as cur:
+            cur.executemany("DELETE FROM thread_activity WHERE thread_id = ?", [(thread_id,) for thread_id in expired])
+            # Only the latest checkpoint is ever read back (checkpoint ids are time-ordered)
+            cur.execute(
+                """DELETE FROM checkpoints WHERE checkpoint_id < (
+                       SELECT MAX(latest.checkpoint_id) FROM checkpoints AS latest
+                       WHERE latest.thread_id = checkpoints.thread_id AND latest.checkpoint_ns = checkpoints.checkpoint_ns)"""
+            )
+            cur.execute(
+                """DELETE FROM writes WHERE NOT EXISTS (
+                       SELECT 1 FROM checkpoints AS c
+                       WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns
+                         AND c.checkpoint_id = writes.checkpoint_id)"""
+            )
+        if expired:
+            print(f"ThreadExpiry: removed {len(expired)} idle conversations")
+        return len(expired)
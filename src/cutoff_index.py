@@ -0,0 +1,222 @@
+# Bitmap index over the categorical columns of the cutoff table (College Filter & Map).
+# Every (column, value) pair gets a packed bitmap of the rows holding that value, built once at load time.
+# A filter is then an OR of the selected values' bitmaps per column and an AND across columns, on 64-bit words,
+# producing row ids without copying the table.
+
+import numpy as np
+import pandas as pd
+
+from src.data_store import CUTOFF_RANK_COLUMNS
+
+INDEXED_COLUMNS = ['Institute', 'College Category', 'Degree', 'Branch Cluster', 'Branch Name',
+                   'Quota', 'Seat Type', 'Gender']
+
+def pack_rows(mask):
+    """Pack a boolean row mask into uint64 words (row r -> bit r % 64 of word r // 64)."""
+    padded = np.zeros(-(-len(mask) // 64) * 64, dtype=bool)
+    padded[:len(mask)] = mask
+    return np.packbits(padded, bitorder='little').view(np.uint64)
+
+def unpack_rows(words, num_rows):
+    """Row ids whose bit is set in `words`."""
+    bits = np.unpackbits(words.view(np.uint8), bitorder='little', count=num_rows)
+    return np.flatnonzero(bits)
+
+
+class CategoricalIndex:
+    """
+    Categorical codes and per-value bitmaps for `columns` of a table.
+    Rows are identified by position (0 .. len(df) - 1), so results can be used with df.iloc / numpy arrays.
+    """
+
+    def __init__(self, df, columns=INDEXED_COLUMNS):
+        self.num_rows = len(df)
+        self.num_words = -(-self.num_rows // 64)
+        self.codes = {}       # column -> int32 code per row (-1 for missing)
+        self.values = {}      # column -> {value: code}
+        self.bitmaps = {}     # column -> uint64 array [num values, num words]
+        for column in columns:
+            codes, uniques = pd.factorize(df[column], sort=True)
+            self.codes[column] = codes.astype(np.int32)
+            self.values[column] = {value: code for code, value in enumerate(uniques)}
+            bitmaps = np.empty((len(uniques), self.num_words), dtype=np.uint64)
+            for code in range(len(uniques)):
+                bitmaps[code] = pack_rows(codes == code)
+            self.bitmaps[column] = bitmaps
+
+    def all_rows(self):
+        words = np.full(self.num_words, np.iinfo(np.uint64).max, dtype=np.uint64)
+        tail = self.num_rows % 64
+        if tail:
+            words[-1] = np.uint64((1 << tail) - 1)
+        return words
+
+    def column_bitmap(self, column, values):
+        """Bitmap of rows whose `column` is any of `values` (values not in the table match nothing)."""
+        codes = [self.values[column][value] for value in values if value in self.values[column]]
+        if not codes:
+            return np.zeros(self.num_words, dtype=np.uint64)
+        return np.bitwise_or.reduce(self.bitmaps[column][codes], axis=0)
+
+    def filter_bitmap(self, selections):
+        """
+        AND of the per-column bitmaps for `selections` ({column: values}).
+        A column that is missing, None, or contains 'All' is not filtered.
+        """
+        result = None
+        for column, values in selections.items():
+            if values is None or 'All' in values:
+                continue
+            bitmap = self.column_bitmap(column, values)
+            result = bitmap if result is None else result & bitmap
+        return self.all_rows() if result is None else result
+
+    def filter_rows(self, selections):
+        """Sorted row ids (positions) matching `selections`; see filter_bitmap()."""
+        return unpack_rows(self.filter_bitmap(selections), self.num_rows)
+
+
+# Closing ranks / opening marks, sorted once per (Quota, Seat Type, Gender) partition, so the rank and score
+# filters become binary searches instead of scans. A missing cutoff (e.g. no Advanced rank for an NIT) never
+# excludes a program, matching the page's original `>= rank | isna()` filters.
+
+RANK_PARTITION_COLUMNS = ['Quota', 'Seat Type', 'Gender']
+
+# column -> (query argument, True if the student's value must be <= the column's value)
+ELIGIBILITY_BOUNDS = {
+    'Closing Rank (Mains)': ('rank_mains', True),
+    'Closing Rank (Advanced)': ('rank_adv', True),
+    'Opening Marks (Mains)': ('score_mains', False),
+    'Opening Marks (Advanced)': ('score_adv', False),
+}
+
+def safety_margin(closing_ranks, rank):
+    """Fraction of the closing rank the student is ahead by: (closing - rank) / closing; NaN without a cutoff."""
+    closing_ranks = np.asarray(closing_ranks, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (closing_ranks - rank) / closing_ranks
+
+
+def partition_row_ids(df, partition_columns):
+    """
+    [(key tuple, sorted row ids)] for every combination of `partition_columns` present in `df`, in key order.
+    A missing value is None in the key, so such rows keep a partition of their own (which only an 'All' selection on
+    that column matches, as in the plain table filter) instead of being dropped as groupby() drops NaN keys.
+    """
+    factorized = [pd.factorize(df[column], sort=True) for column in partition_columns]
+    if not len(df):
+        return []
+    codes = np.stack([column_codes for column_codes, _ in factorized], axis=1)
+    keys, inverse = np.unique(codes, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind='stable')
+    starts = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+    return [(tuple(None if code < 0 else uniques[code] for code, (_, uniques) in zip(key, factorized)),
+             order[starts[i]:starts[i + 1]])
+            for i, key in enumerate(keys)]
+
+
+class RankIndex:
+    """
+    Per-partition sorted cutoff columns of the cutoff table.
+    Rows are identified by position, like CategoricalIndex, so the two can be combined bitmap-wise.
+    """
+
+    def __init__(self, df, partition_columns=RANK_PARTITION_COLUMNS, columns=tuple(ELIGIBILITY_BOUNDS)):
+        self.num_rows = len(df)
+        self.partition_columns = list(partition_columns)
+        self.partitions = {}      # partition key -> {column: (sorted values, their row ids, row ids with no value)}
+        self.partition_rows = {}  # partition key -> row ids
+        values = {column: df[column].to_numpy(dtype=np.float64, na_value=np.nan) for column in columns}
+        for key, rows in partition_row_ids(df, self.partition_columns):
+            self.partition_rows[key] = rows
+            self.partitions[key] = {}
+            for column in columns:
+                column_values = values[column][rows]
+                present = ~np.isnan(column_values)
+                order = np.argsort(column_values[present], kind='stable')
+                self.partitions[key][column] = (column_values[present][order], rows[present][order], rows[~present])
+
+    def matching_partitions(self, selections):
+        """Partition keys allowed by `selections` ({column: values}; None or 'All' allows any)."""
+        keys = []
+        for key in self.partitions:
+            if all(selections.get(column) is None or 'All' in selections[column] or value in selections[column]
+                   for column, value in zip(self.partition_columns, key)):
+                keys.append(key)
+        return keys
+
+    def bounded_rows(self, key, column, bound, upper):
+        """
+        Rows of partition `key` whose `column` is >= bound (upper=True) or <= bound, and the rows without a value.
+        Both are views into the sorted arrays.
+        """
+        sorted_values, rows, missing = self.partitions[key][column]
+        if upper:
+            return rows[np.searchsorted(sorted_values, bound, side='left'):], missing
+        return rows[:np.searchsorted(sorted_values, bound, side='right')], missing
+
+    def eligible_mask(self, selections, **bounds):
+        """
+        Boolean row mask: rows in the partitions allowed by `selections` that the student clears.
+        `bounds` are any of rank_mains, rank_adv, score_mains, score_adv; None skips that check.
+        """
+        active = [(column, bounds[argument], upper) for column, (argument, upper) in ELIGIBILITY_BOUNDS.items()
+                  if bounds.get(argument) is not None]
+        # Count the bounds each row clears; eligible rows clear all of them
+        cleared = np.zeros(self.num_rows, dtype=np.uint8)
+        for key in self.matching_partitions(selections):
+            if not active:
+                cleared[self.partition_rows[key]] = 1
+            for column, bound, upper in active:
+                matched, missing = self.bounded_rows(key, column, bound, upper)
+                cleared[matched] += 1
+                cleared[missing] += 1
+        return cleared == max(len(active), 1)
+
+    def eligible_rows(self, selections, **bounds):
+        """Sorted row ids of eligible_mask()."""
+        return np.flatnonzero(self.eligible_mask(selections, **bounds))
+
+    def eligible_bitmap(self, selections, **bounds):
+        return pack_rows(self.eligible_mask(selections, **bounds))
+
+
+STATISTICS_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+class CutoffStatistics:
+    """
+    min / max / quantiles of the rank and marks columns, over the whole table and per (Quota, Seat Type, Gender)
+    partition, computed once so the page's input ranges and hints don't scan the table on every rerun.
+    """
+
+    def __init__(self, df, columns=CUTOFF_RANK_COLUMNS, partition_columns=RANK_PARTITION_COLUMNS,
+                 quantiles=STATISTICS_QUANTILES):
+        self.columns = list(columns)
+        self.quantiles = tuple(quantiles)
+        self.overall = self.summarise(df[self.columns])
+        self.partitions = {key if isinstance(key, tuple) else (key,): self.summarise(group)
+                           for key, group in df.groupby(list(partition_columns), observed=True)[self.columns]}
+
+    def summarise(self, frame):
+        """{column: {'min': .., 'max': .., 0.1: .., ...}} (NaN where the column has no values)."""
+        summary = {column: {'min': float(frame[column].min()), 'max': float(frame[column].max())}
+                   for column in self.columns}
+        quantile_table = frame.quantile(list(self.quantiles))
+        for column in self.columns:
+            for q in self.quantiles:
+                summary[column][q] = float(quantile_table.at[q, column])
+        return summary
+
+    def stats(self, column, partition=None):
+        """Summary of `column` for a (Quota, Seat Type, Gender) partition, or the whole table if None."""
+        return self.overall[column] if partition is None else self.partitions[tuple(partition)][column]
+
+    def min(self, column, partition=None):
+        return self.stats(column, partition)['min']
+
+    def max(self, column, partition=None):
+        return self.stats(column, partition)['max']
+
+    def quantile(self, column, q, partition=None):
+        return self.stats(column, partition)[q]
@@ -0,0 +1,495 @@
+# College Filter & Map queries without Streamlit.
+# A FilterSpec (categorical filters plus the student's ranks/marks) goes in; matching programs come out ranked by
+# safety margin. match()/query() serve one profile through the bitmap, sorted-rank and spatial indexes, batch_query()
+# evaluates many profiles in one vectorised pass, closing_rank_trend() follows programs across the (year, round)
+# partitions of data_store.cutoff_rounds, and serve() exposes them over a local HTTP endpoint.
+#
+# Usage (from the project root):
+#   python -m src.cutoff_query --serve --port 8502
+#   python -m src.cutoff_query --batch profiles.json --top-k 10 > results.json
+
+from pydantic import BaseModel, Field, StrictBool, StrictInt, ValidationError, field_validator
+
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import argparse
+import json
+import numpy as np
+import pandas as pd
+
+from src.cutoff_index import (CategoricalIndex, CutoffStatistics, ELIGIBILITY_BOUNDS, RankIndex, safety_margin,
+                              unpack_rows)
+from src.data_store import CUTOFF_RANK_COLUMNS, FINAL_ROUND, cutoff_rounds, load_dataset, derived
+from src.option_hierarchy import OptionHierarchy
+from src.spatial_index import SpatialIndex
+
+RESULT_COLUMNS = ['Institute', 'College Category', 'Program Code', 'Branch Cluster', 'Degree',
+                  'Branch Name', 'Degree Duration', 'Seat Capacity (w.r.t. Quota)', 'Aggregated Seats',
+                  'Quota', 'Seat Type', 'Gender', 'Rank Range (Mains)', 'Score Range (Mains)',
+                  'Rank Range (Advanced)', 'Score Range (Advanced)', 'View Details', 'Safety Margin']
+
+# Every column the results table can show: RESULT_COLUMNS (the default selection) plus the numeric rank/marks columns
+TABLE_COLUMNS = RESULT_COLUMNS + CUTOFF_RANK_COLUMNS
+
+# Sort keys offered for the results table: the numeric rank/marks columns instead of the text "... Range" columns
+# (which would sort as strings), then the other text columns
+SORT_COLUMNS = (['Safety Margin'] + CUTOFF_RANK_COLUMNS
+                + [column for column in RESULT_COLUMNS if column != 'Safety Margin' and 'Range' not in column])
+
+BATCH_COLUMNS = ['Institute', 'Branch Name', 'Degree', 'Quota', 'Seat Type', 'Gender',
+                 'Closing Rank (Mains)', 'Closing Rank (Advanced)', 'Safety Margin']
+
+# Columns that identify a program across years and rounds
+PROGRAM_KEY = ['Institute', 'Degree', 'Branch Name', 'Quota', 'Seat Type', 'Gender']
+TREND_EXAMS = ['Mains', 'Advanced']
+
+# Profiles per [profiles x candidate rows] block in batch_query()
+BATCH_CHUNK = 256
+
+
+class FilterSpec(BaseModel):
+    """
+    One student's filters. 'All' (the default) leaves a column unfiltered; a None rank/score skips that check.
+    With a home location, radius_km and/or nearest keep only the institutes within that distance / the nearest ones.
+    """
+    institutes: List[str] = ['All']
+    college_categories: List[str] = ['All']
+    degrees: List[str] = ['All']
+    branch_clusters: List[str] = ['All']
+    branches: List[str] = ['All']
+    quotas: List[str] = ['All']
+    seat_types: List[str] = ['All']
+    genders: List[str] = ['All']
+    rank_mains: Optional[float] = None
+    score_mains: Optional[float] = None
+    rank_adv: Optional[float] = None
+    score_adv: Optional[float] = None
+    home_latitude: Optional[float] = None
+    home_longitude: Optional[float] = None
+    radius_km: Optional[float] = None
+    nearest: Optional[int] = None
+
+    def selections(self):
+        """{table column: selected values}, as CategoricalIndex / RankIndex take them."""
+        return {
+            'Institute': self.institutes,
+            'College Category': self.college_categories,
+            'Degree': self.degrees,
+            'Branch Cluster': self.branch_clusters,
+            'Branch Name': self.branches,
+            'Quota': self.quotas,
+            'Seat Type': self.seat_types,
+            'Gender': self.genders,
+        }
+
+    def bounds(self):
+        return {'rank_mains': self.rank_mains, 'score_mains': self.score_mains,
+                'rank_adv': self.rank_adv, 'score_adv': self.score_adv}
+
+    def location(self):
+        """(latitude, longitude, radius_km, nearest), or None when no distance filter is set."""
+        if self.radius_km is None and self.nearest is None:
+            return None
+        if self.home_latitude is None or self.home_longitude is None:
+            raise ValueError("radius_km / nearest need home_latitude and home_longitude")
+        return (self.home_latitude, self.home_longitude, self.radius_km, self.nearest)
+
+    def selection_key(self):
+        """Hashable form of selections() and location(); profiles with equal keys match the same candidate rows."""
+        return tuple(tuple(sorted(values)) for values in self.selections().values()) + (self.location(),)
+
+
+def cutoff_table():
+    """The 2024 cutoff table (shared, loaded on first use)."""
+    return load_dataset('cutoffs')
+
+def cutoff_index():
+    """Bitmap index over the table's categorical filter columns, built once."""
+    return derived('cutoffs', 'categorical_index', CategoricalIndex)
+
+def rank_index():
+    """Closing ranks / opening marks sorted per (Quota, Seat Type, Gender), built once."""
+    return derived('cutoffs', 'rank_index', RankIndex)
+
+def option_hierarchy():
+    """Degree -> Branch Cluster -> Branch Name options (and the flat filter lists), built once."""
+    return derived('cutoffs', 'option_hierarchy',
+                   lambda df: OptionHierarchy(df, ['Degree', 'Branch Cluster', 'Branch Name'],
+                                              flat_columns=['Institute', 'College Category', 'Quota', 'Seat Type',
+                                                            'Gender']))
+
+def cutoff_statistics():
+    """min / max / quantiles of the rank and marks columns, overall and per seat partition, computed once."""
+    return derived('cutoffs', 'statistics', CutoffStatistics)
+
+def spatial_index():
+    """BallTree over the institutes' coordinates, built once."""
+    return derived('cutoffs', 'spatial_index', SpatialIndex)
+
+def nearby_institutes(spec):
+    """[(institute, km)] allowed by the spec's distance filter, nearest first, or None without one."""
+    location = spec.location()
+    if location is None:
+        return None
+    latitude, longitude, radius_km, nearest = location
+    return spatial_index().search(latitude, longitude, radius_km=radius_km, k=nearest)
+
+def candidate_bitmap(spec):
+    """Rows allowed by the categorical and distance filters of `spec` (before the rank/marks checks)."""
+    bitmap = cutoff_index().filter_bitmap(spec.selections())
+    nearby = nearby_institutes(spec)
+    if nearby is not None:
+        bitmap &= cutoff_index().column_bitmap('Institute', [name for name, _ in nearby])
+    return bitmap
+
+def match(spec):
+    """
+    (row positions, safety margins) of the programs matching `spec` whose cutoffs the student clears,
+    safest first, without building the result frame.
+    The margin is the smaller of the Mains/Advanced margins, (closing rank - rank) / closing rank, for the
+    ranks given; programs with no applicable closing rank come last.
+    """
+    selections = spec.selections()
+    bitmap = candidate_bitmap(spec) & rank_index().eligible_bitmap(selections, **spec.bounds())
+    df = cutoff_table()
+    rows = unpack_rows(bitmap, len(df))
+
+    margins = [safety_margin(df[f'Closing Rank ({exam})'].to_numpy()[rows], rank)
+               for exam, rank in (('Mains', spec.rank_mains), ('Advanced', spec.rank_adv)) if rank is not None]
+    margin = np.fmin.reduce(margins) if margins else np.full(len(rows), np.nan)
+    order = np.argsort(-margin, kind='stable')
+    return rows[order], margin[order]
+
+def summarise(rows):
+    """Counts of matching programs, institutes and branches, from the row positions alone."""
+    index = cutoff_index()
+    return {
+        'programs': len(rows),
+        'institutes': len(np.unique(index.codes['Institute'][rows])),
+        'branches': len(np.unique(index.codes['Branch Name'][rows])),
+    }
+
+def institutes_of(rows):
+    """Sorted tuple of the institutes among `rows`."""
+    index = cutoff_index()
+    names = list(index.values['Institute'])
+    return tuple(sorted(names[code] for code in np.unique(index.codes['Institute'][rows]) if code >= 0))
+
+def sort_rows(rows, margin, sort_by='Safety Margin', descending=True):
+    """
+    `rows` and `margin` reordered by `sort_by` (a table column or 'Safety Margin'), missing values last.
+    Only the sort column is gathered for the matching rows.
+    """
+    if sort_by == 'Safety Margin':
+        keys = pd.Series(margin)
+    else:
+        keys = cutoff_table()[sort_by].iloc[rows].reset_index(drop=True)
+    order = keys.sort_values(ascending=not descending, na_position='last', kind='stable').index.to_numpy()
+    return rows[order], margin[order]
+
+def take(rows, margin, columns=RESULT_COLUMNS):
+    """The given rows as a DataFrame with `columns` ('Safety Margin' filled from `margin`)."""
+    table = cutoff_table().iloc[rows][[column for column in columns if column != 'Safety Margin']]
+    table = table.reset_index(drop=True)
+    if 'Safety Margin' in columns:
+        table['Safety Margin'] = margin
+    return table[list(columns)]
+
+def result_page(rows, margin, sort_by='Safety Margin', descending=True, offset=0, limit=None, columns=RESULT_COLUMNS):
+    """match() results as a DataFrame, sorted and sliced to [offset, offset + limit)."""
+    if sort_by != 'Safety Margin' or not descending:
+        rows, margin = sort_rows(rows, margin, sort_by, descending)
+    end = None if limit is None else offset + limit
+    return take(rows[offset:end], margin[offset:end], columns)
+
+def query(spec, sort_by='Safety Margin', descending=True, offset=0, limit=None, columns=RESULT_COLUMNS):
+    """Matching programs for one FilterSpec as a DataFrame, sorted and sliced to [offset, offset + limit)."""
+    rows, margin = match(spec)
+    return result_page(rows, margin, sort_by, descending, offset, limit, columns)
+
+def partition_label(partition):
+    year, round_label = partition
+    return f"{year} {round_label}" if round_label == FINAL_ROUND else f"{year} R{round_label}"
+
+def closing_rank_trend(rows, exam='Advanced', partitions=None):
+    """
+    Closing rank ({exam}) of the programs at `rows` of the current table in every (year, round) partition:
+    one row per entry of `rows`, one column per partition label, oldest first, NaN where a program has no cutoff.
+    Programs are matched on PROGRAM_KEY; each partition is read with just those columns and joined in one merge.
+    """
+    if exam not in TREND_EXAMS:
+        raise ValueError(f"exam must be one of {TREND_EXAMS}, not {exam!r}")
+    column = f'Closing Rank ({exam})'
+    partitions = cutoff_rounds.partitions() if partitions is None else partitions
+    programs = cutoff_table().iloc[rows][PROGRAM_KEY].astype(str).reset_index(drop=True)
+    programs['program'] = np.arange(len(programs))
+    institutes = programs['Institute'].unique()
+
+    found = []
+    for partition in partitions:
+        frame = cutoff_rounds.load(partition, PROGRAM_KEY + [column])
+        # Narrow to the programs' institutes on the categorical column before building string keys
+        frame = frame[frame['Institute'].isin(institutes)]
+        keys = frame[PROGRAM_KEY].astype(str)
+        keys[column] = frame[column].to_numpy()
+        matched = programs.merge(keys, on=PROGRAM_KEY, how='inner')[['program', column]]
+        matched['partition'] = partition_label(partition)
+        found.append(matched)
+
+    labels = [partition_label(partition) for partition in partitions]
+    if not found:
+        return pd.DataFrame(index=range(len(programs)), columns=labels, dtype=float)
+    trend = pd.concat(found).pivot_table(index='program', columns='partition', values=column, aggfunc='min')
+    return trend.reindex(index=range(len(programs)), columns=labels)
+
+def trend_records(trend):
+    """{partition label: closing rank} per program, without the partitions it has no cutoff in."""
+    return [{label: value for label, value in row.items() if value == value}
+            for row in trend.to_dict(orient='records')]
+
+def top_k_order(keys, k):
+    """
+    Per row, the column positions of the k largest keys, largest first, ties in column order; the same
+    result as a stable argsort of -keys cut to k, without sorting whole rows.
+    """
+    k = min(k, keys.shape[1])
+    if k == 0:
+        return np.empty((keys.shape[0], 0), dtype=np.intp)
+    threshold = np.partition(-keys, k - 1, axis=1)[:, k - 1:k]
+    better, tied = -keys < threshold, -keys == threshold
+    # Fill the places left after the strictly better keys with the first tied columns
+    selected = better | (tied & (np.cumsum(tied, axis=1) <= k - better.sum(axis=1, keepdims=True)))
+    columns = np.nonzero(selected)[1].reshape(len(keys), k)
+    return np.take_along_axis(columns, np.argsort(-np.take_along_axis(keys, columns, axis=1), axis=1, kind='stable'),
+                              axis=1)
+
+def batch_match(specs, top_k=10):
+    """
+    match() for many profiles at once: (eligible counts, top_k row positions per profile padded with -1,
+    their margins). Profiles with the same categorical and distance filters share one bitmap lookup; their rank/marks checks
+    and margins are evaluated together as [profiles x candidate rows] arrays.
+    """
+    df = cutoff_table()
+    counts = np.zeros(len(specs), dtype=np.int64)
+    top_rows = np.full((len(specs), top_k), -1, dtype=np.intp)
+    top_margins = np.full((len(specs), top_k), np.nan)
+
+    values = {column: df[column].to_numpy(dtype=np.float64, na_value=np.nan) for column in ELIGIBILITY_BOUNDS}
+    groups = defaultdict(list)
+    for position, spec in enumerate(specs):
+        groups[spec.selection_key()].append(position)
+
+    for members in groups.values():
+        candidates = unpack_rows(candidate_bitmap(specs[members[0]]), len(df))
+        if not len(candidates):
+            continue
+        candidate_values = {column: column_values[candidates][None, :] for column, column_values in values.items()}
+        for start in range(0, len(members), BATCH_CHUNK):
+            chunk = np.array(members[start:start + BATCH_CHUNK])
+            bounds = {argument: np.array([np.nan if getattr(specs[p], argument) is None else getattr(specs[p], argument)
+                                          for p in chunk])[:, None]
+                      for argument, _ in ELIGIBILITY_BOUNDS.values()}
+
+            # A missing bound or a missing cutoff never excludes a program, as in RankIndex
+            eligible = np.ones((len(chunk), len(candidates)), dtype=bool)
+            for column, (argument, upper) in ELIGIBILITY_BOUNDS.items():
+                bound, cutoff = bounds[argument], candidate_values[column]
+                with np.errstate(invalid='ignore'):
+                    cleared = cutoff >= bound if upper else cutoff <= bound
+                eligible &= cleared | np.isnan(bound) | np.isnan(cutoff)
+
+            margin = np.full(eligible.shape, np.nan)
+            for exam, argument in (('Mains', 'rank_mains'), ('Advanced', 'rank_adv')):
+                margin = np.fmin(margin, safety_margin(candidate_values[f'Closing Rank ({exam})'], bounds[argument]))
+
+            # Eligible rows by margin (no margin ranks below any margin), ineligible rows never picked
+            keys = np.where(eligible, np.where(np.isnan(margin), -1.0, margin), -np.inf)
+            order = top_k_order(keys, top_k)
+            picked = np.take_along_axis(keys, order, axis=1) > -np.inf
+
+            counts[chunk] = eligible.sum(axis=1)
+            top_rows[chunk, :order.shape[1]] = np.where(picked, candidates[order], -1)
+            top_margins[chunk, :order.shape[1]] = np.where(picked, np.take_along_axis(margin, order, axis=1), np.nan)
+    return counts, top_rows, top_margins
+
+def to_records(frame):
+    """JSON-ready records (NaN -> None)."""
+    return json.loads(frame.to_json(orient='records'))
+
+def batch_query(specs, top_k=10, columns=BATCH_COLUMNS, trend_exam=None):
+    """
+    [{'count': eligible programs, 'programs': top_k records, safest first}] for each FilterSpec.
+    With trend_exam ('Mains' or 'Advanced') each record also gets 'Closing Rank Trend': {partition label: rank}.
+    """
+    counts, top_rows, top_margins = batch_match(specs, top_k)
+    shown = np.unique(top_rows[top_rows >= 0])
+    shown_records = to_records(take(shown, np.full(len(shown), np.nan), [c for c in columns if c != 'Safety Margin']))
+    if trend_exam:
+        for record, trend in zip(shown_records, trend_records(closing_rank_trend(shown, trend_exam))):
+            record['Closing Rank Trend'] = trend
+    records = dict(zip(shown.tolist(), shown_records))
+    results = []
+    for count, rows, margins in zip(counts, top_rows, top_margins):
+        programs = []
+        for row, margin in zip(rows.tolist(), margins.tolist()):
+            if row < 0:
+                break
+            record = dict(records[row])
+            if 'Safety Margin' in columns:
+                record['Safety Margin'] = None if margin != margin else margin
+            programs.append(record)
+        results.append({'count': int(count), 'programs': programs})
+    return results
+
+
+def valid_columns(columns):
+    """Reject empty or unknown output columns before they reach take()."""
+    unknown = [column for column in columns if column not in TABLE_COLUMNS]
+    if not columns or unknown:
+        raise ValueError(f"columns must be a non-empty subset of {TABLE_COLUMNS}; unknown: {unknown}")
+    return columns
+
+class QueryRequest(BaseModel):
+    """Body of POST /query."""
+    filters: FilterSpec = Field(default_factory=FilterSpec)
+    sort_by: str = 'Safety Margin'
+    descending: StrictBool = True
+    offset: StrictInt = Field(0, ge=0)
+    limit: Optional[StrictInt] = Field(50, gt=0)
+    columns: List[str] = RESULT_COLUMNS
+
+    @field_validator('sort_by')
+    @classmethod
+    def check_sort_by(cls, sort_by):
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"sort_by must be one of {SORT_COLUMNS}")
+        return sort_by
+
+    @field_validator('columns')
+    @classmethod
+    def check_columns(cls, columns):
+        return valid_columns(columns)
+
+class BatchRequest(BaseModel):
+    """Body of POST /batch."""
+    profiles: List[FilterSpec] = []
+    top_k: StrictInt = Field(10, gt=0)
+    columns: List[str] = BATCH_COLUMNS
+    trend_exam: Optional[str] = None
+
+    @field_validator('columns')
+    @classmethod
+    def check_columns(cls, columns):
+        return valid_columns(columns)
+
+    @field_validator('trend_exam')
+    @classmethod
+    def check_trend_exam(cls, exam):
+        if exam is not None and exam not in TREND_EXAMS:
+            raise ValueError(f"trend_exam must be one of {TREND_EXAMS}")
+        return exam
+
+class TrendRequest(BaseModel):
+    """Body of POST /trend."""
+    filters: FilterSpec = Field(default_factory=FilterSpec)
+    exam: str = 'Advanced'
+    limit: StrictInt = Field(20, gt=0)
+
+    @field_validator('exam')
+    @classmethod
+    def check_exam(cls, exam):
+        if exam not in TREND_EXAMS:
+            raise ValueError(f"exam must be one of {TREND_EXAMS}")
+        return exam
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health                      -> {"status": "ok", "rows": ...}
+    GET  /options                     -> flat option lists for every filter column
+    POST /query  {"filters": {...}, "sort_by", "descending", "offset", "limit", "columns"}
+    POST /batch  {"profiles": [{...}, ...], "top_k", "columns", "trend_exam"}
+    POST /trend  {"filters": {...}, "exam", "limit"}  -> closing-rank trend of the top matches per (year, round)
+    Bodies are validated by QueryRequest / BatchRequest / TrendRequest; any invalid field is a 400.
+    """
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok", "rows": len(cutoff_table())})
+        elif self.path == "/options":
+            options = option_hierarchy()
+            self.send_json(200, {column: options.options(column) for column in options.flat})
+        else:
+            self.send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        try:
+            payload = self.read_json()
+            if self.path == "/query":
+                request = QueryRequest.model_validate(payload)
+                # One match() serves both the summary and the page
+                rows, margin = match(request.filters)
+                frame = result_page(rows, margin, sort_by=request.sort_by, descending=request.descending,
+                                    offset=request.offset, limit=request.limit, columns=request.columns)
+                self.send_json(200, {"summary": summarise(rows), "programs": to_records(frame)})
+            elif self.path == "/batch":
+                request = BatchRequest.model_validate(payload)
+                results = batch_query(request.profiles, top_k=request.top_k, columns=request.columns,
+                                      trend_exam=request.trend_exam)
+                self.send_json(200, {"results": results})
+            elif self.path == "/trend":
+                request = TrendRequest.model_validate(payload)
+                rows, _ = match(request.filters)
+                rows = rows[:request.limit]
+                trend = closing_rank_trend(rows, request.exam)
+                programs = to_records(take(rows, None, PROGRAM_KEY))
+                for program, ranks in zip(programs, trend_records(trend)):
+                    program["Closing Rank Trend"] = ranks
+                self.send_json(200, {"partitions": list(trend.columns), "programs": programs})
+            else:
+                self.send_json(404, {"error": f"unknown path {self.path}"})
+        except (ValidationError, ValueError, KeyError) as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            # Always answer, so a bug never shows up as a dropped connection
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+def serve(host="127.0.0.1", port=8502):
+    # Build the table and indexes before accepting requests
+    cutoff_index(), rank_index(), option_hierarchy(), spatial_index()
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"---SERVING CUTOFF QUERIES ON http://{host}:{port}---")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the JoSAA cutoff table without the Streamlit page.")
+    parser.add_argument("--serve", action="store_true", help="run the local HTTP endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--batch", help="JSON file with a list of filter specs; results are printed as JSON")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--trend", choices=TREND_EXAMS, help="add each program's closing-rank trend")
+    args = parser.parse_args()
+
+    if args.batch:
+        with open(args.batch, "r") as f:
+            specs = [FilterSpec(**profile) for profile in json.load(f)]
+        print(json.dumps(batch_query(specs, top_k=args.top_k, trend_exam=args.trend), indent=2))
+    elif args.serve:
+        serve(args.host, args.port)
+    else:
+        parser.print_help()
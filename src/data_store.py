@@ -0,0 +1,230 @@
+# Shared, typed access to the CSV datasets in data/.
+# Each CSV is compiled once into a Parquet file under data/compiled/ (string columns as categoricals, ranks/marks/
+# coordinates as floats, '-' as missing) and recompiled only when the CSV is newer. Frames are loaded on first use,
+# memory-mapped, and shared by every module in the process instead of each page parsing its own CSV at import.
+# Callers get copy-on-write views of the shared frames: a caller that assigns into its frame gets its own copy of the
+# columns it touches, and the shared frame (and everything derived from it) never changes.
+#
+# Usage (optional, to compile ahead of the first page load):
+#   python -m src.data_store
+
+import os
+import re
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))          # current directory
+TRUNK_DIR = os.path.abspath(os.path.join(CURRENT_DIR, '..'))      # Move up one level to reach the trunk
+DATA_DIR = os.path.join(TRUNK_DIR, 'data')
+COMPILED_DIR = os.path.join(DATA_DIR, 'compiled')
+
+CUTOFF_RANK_COLUMNS = ['Opening Rank (Mains)', 'Closing Rank (Mains)', 'Opening Marks (Mains)', 'Closing Marks (Mains)',
+                       'Opening Rank (Advanced)', 'Closing Rank (Advanced)', 'Opening Marks (Advanced)',
+                       'Closing Marks (Advanced)']
+
+# name -> CSV file and the columns it must have, by type
+DATASETS = {
+    # Specialization Recommender
+    'seats': {
+        'file': 'josaa_seats_aggregated.csv',
+        'categorical': ['College Name', 'College Category', 'Branch Cluster', 'Degree Duration', 'Degree',
+                        'Quota', 'View Details'],
+        'numeric': ['Seat Capacity', 'Aggregated Seats'],
+    },
+    # College-Branch Insight Hub
+    'branchwise': {
+        'file': 'josaa_branchwise_info_viz.csv',
+        'categorical': ['College Name', 'College Category', 'State', 'Website', 'View Details', 'Degree',
+                        'Branch Cluster', 'Branch Name', 'Degree Duration', 'Mode of Admission'],
+        'numeric': ['Latitude', 'Longitude', 'Aggregated Seats'],
+    },
+    # College Filter & Map
+    'cutoffs': {
+        'file': 'final_op_cl_seat_info_consolidated_2024_op_cl_with_marks_splitted_coord.csv',
+        'categorical': ['Institute', 'College Category', 'Degree', 'Branch Cluster', 'Branch Name', 'Degree Duration',
+                        'Quota', 'Seat Type', 'Gender', 'View Details'],
+        'numeric': CUTOFF_RANK_COLUMNS + ['Latitude', 'Longitude'],
+    },
+}
+
+# Always on from pandas 3; pandas 2 needs it switched on for the views below to be copy-on-write
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+_frames = {}
+_derived = {}
+_lock = threading.RLock()
+
+def csv_path(name):
+    return os.path.join(DATA_DIR, DATASETS[name]['file'])
+
+def compiled_path(name):
+    return os.path.join(COMPILED_DIR, f"{name}.parquet")
+
+def validate_schema(spec, df, label):
+    """Raise ValueError if a table is missing any column the app relies on."""
+    missing = [column for column in spec['categorical'] + spec['numeric'] if column not in df.columns]
+    if missing:
+        raise ValueError(f"{label} is missing columns: {missing}")
+
+def read_typed_csv(path, spec):
+    df = pd.read_csv(path, na_values=['-'])
+    df = df.drop(columns=[column for column in df.columns if column.startswith('Unnamed:')])
+    validate_schema(spec, df, os.path.basename(path))
+    for column in spec['numeric']:
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    for column in spec['categorical']:
+        df[column] = df[column].astype('category')
+    return df
+
+def compile_csv(path, target, spec):
+    """Compile the CSV at `path` to Parquet at `target` (atomically) and return the typed frame."""
+    df = read_typed_csv(path, spec)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + ".tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, target)
+    return df
+
+def compile_dataset(name):
+    """Compile data/<file>.csv to data/compiled/<name>.parquet and return the typed frame."""
+    return compile_csv(csv_path(name), compiled_path(name), DATASETS[name])
+
+def needs_compiling(path, target):
+    return not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(path)
+
+def is_stale(name):
+    return needs_compiling(csv_path(name), compiled_path(name))
+
+def load_dataset(name):
+    """
+    A copy-on-write view of the typed frame for `name`, compiled if needed and loaded once per process.
+    Modifying the view copies what it changes, so callers never see each other's edits.
+    """
+    if name in _frames:
+        return _frames[name].copy(deep=False)
+    with _lock:
+        if name not in _frames:
+            if is_stale(name):
+                print(f"---COMPILING {DATASETS[name]['file']}---")
+                compile_dataset(name)
+            df = pd.read_parquet(compiled_path(name), memory_map=True)
+            validate_schema(DATASETS[name], df, DATASETS[name]['file'])
+            _frames[name] = df
+    return _frames[name].copy(deep=False)
+
+def derived(name, key, build):
+    """build(load_dataset(name)), computed once per process (indexes, option lists, ...)."""
+    if (name, key) in _derived:
+        return _derived[(name, key)]
+    with _lock:
+        if (name, key) not in _derived:
+            _derived[(name, key)] = build(load_dataset(name))
+    return _derived[(name, key)]
+
+
+# Earlier years and individual JoSAA rounds: data/cutoffs/<year>/round_<n>.csv, with the 2024 table's columns
+# (only the ones below are required). The consolidated 2024 table joins them as (2024, 'final').
+CUTOFF_ROUNDS_DIR = os.path.join(DATA_DIR, 'cutoffs')
+CUTOFF_ROUND_SPEC = {
+    'categorical': ['Institute', 'Degree', 'Branch Name', 'Quota', 'Seat Type', 'Gender'],
+    'numeric': CUTOFF_RANK_COLUMNS,
+}
+FINAL_ROUND = 'final'
+ROUND_FILE_PATTERN = re.compile(r"round_(\d+)\.csv$")
+
+def round_sort_key(partition):
+    year, round_label = partition
+    return (year, round_label == FINAL_ROUND, int(round_label) if round_label.isdigit() else 0)
+
+class CutoffRounds:
+    """
+    Cutoff tables partitioned by (year, round). Partitions are found from file names alone (listed again only when
+    the directory or a year directory changes); each is compiled to Parquet the first time it is read, and only the
+    requested columns are loaded. At most `max_loaded` column projections are kept (least recently used first out),
+    so many years x rounds never sit in memory at once.
+    """
+
+    def __init__(self, directory=CUTOFF_ROUNDS_DIR, max_loaded=64):
+        self.directory = directory
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()     # (year, round, columns) -> frame
+        self._listing = None             # (directory signature, year directories, round files) of the last listing
+        self._lock = threading.Lock()
+
+    def directory_signature(self, year_dirs):
+        """mtimes of the directory and the year directories: any file added, removed or renamed changes one."""
+        try:
+            return tuple(os.stat(path).st_mtime_ns for path in [self.directory] + year_dirs)
+        except FileNotFoundError:
+            return None
+
+    def round_files(self):
+        """(year, round) -> CSV path for the per-round files on disk (shared between calls; do not modify)."""
+        listing = self._listing
+        if listing is not None and self.directory_signature(listing[1]) == listing[0]:
+            return listing[2]
+        files = {}
+        year_dirs = []
+        if os.path.isdir(self.directory):
+            # Each mtime is taken before its directory is listed, so a change made meanwhile shows up next call
+            signature = [os.stat(self.directory).st_mtime_ns]
+            for year in sorted(os.listdir(self.directory)):
+                year_dir = os.path.join(self.directory, year)
+                if not (year.isdigit() and os.path.isdir(year_dir)):
+                    continue
+                year_dirs.append(year_dir)
+                signature.append(os.stat(year_dir).st_mtime_ns)
+                for file_name in os.listdir(year_dir):
+                    found = ROUND_FILE_PATTERN.match(file_name)
+                    if found:
+                        files[(int(year), found.group(1))] = os.path.join(year_dir, file_name)
+            self._listing = (tuple(signature), year_dirs, files)
+        return files
+
+    def partitions(self):
+        """Sorted (year, round) pairs available, oldest first, 'final' after a year's numbered rounds."""
+        partitions = set(self.round_files())
+        if os.path.exists(csv_path('cutoffs')):
+            partitions.add((2024, FINAL_ROUND))
+        return sorted(partitions, key=round_sort_key)
+
+    def read(self, partition, columns):
+        if partition == (2024, FINAL_ROUND) and partition not in self.round_files():
+            return load_dataset('cutoffs')[list(columns)]
+        year, round_label = partition
+        path = self.round_files()[partition]
+        target = os.path.join(COMPILED_DIR, 'cutoffs', str(year), f"round_{round_label}.parquet")
+        if needs_compiling(path, target):
+            print(f"---COMPILING {os.path.relpath(path, DATA_DIR)}---")
+            compile_csv(path, target, CUTOFF_ROUND_SPEC)
+        return pd.read_parquet(target, columns=list(columns), memory_map=True)
+
+    def load(self, partition, columns):
+        """Copy-on-write view of the frame with `columns` of one (year, round) partition."""
+        key = (tuple(partition), tuple(columns))
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key].copy(deep=False)
+        df = self.read(tuple(partition), columns)
+        with self._lock:
+            self._loaded[key] = df
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return df.copy(deep=False)
+
+cutoff_rounds = CutoffRounds()
+
+
+if __name__ == "__main__":
+    for name in DATASETS:
+        if not os.path.exists(csv_path(name)):
+            print(f"{name}: {DATASETS[name]['file']} not found, skipped")
+            continue
+        df = compile_dataset(name)
+        print(f"{name}: {len(df)} rows, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB -> {compiled_path(name)}")
+    for (year, round_label), path in sorted(cutoff_rounds.round_files().items(), key=lambda item: round_sort_key(item[0])):
+        cutoff_rounds.read((year, round_label), CUTOFF_ROUND_SPEC['categorical'])
+        print(f"cutoffs {year} round {round_label}: ready")
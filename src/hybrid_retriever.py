@@ -0,0 +1,122 @@
+# Hybrid lexical + vector retrieval for JEE Docs Chat.
+# The FAISS search misses on exact terms (dates, form names, category codes like "GEN-EWS"), which sends
+# the question through refine_question rewrites and re-retrieval. A BM25 inverted index over the same parent
+# documents catches those terms, and reciprocal rank fusion (RRF) merges both rankings, so exact-term
+# questions succeed on the first retrieval.
+# With the in-memory docstore the BM25 index is built in memory at start-up; in disk mode load_retriever() passes the
+# docstore's own FTS5 index (sqlite_docstore.SQLiteLexicalIndex) instead, so no document is loaded up front.
+
+from collections import defaultdict
+
+import re
+import numpy as np
+
+# Words, numbers, and compound tokens such as "gen-ews", "01.06.2025", "b.tech", "obc-ncl"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-/.][a-z0-9]+)*")
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        # Also index the parts of a compound token, so "GEN EWS" and "GEN-EWS" still meet
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-/.]", token) if part)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index (term -> doc positions and term frequencies)."""
+
+    def __init__(self, doc_ids, texts, k1=1.5, b=0.75):
+        self.doc_ids = list(doc_ids)
+        self.k1 = k1
+        self.b = b
+
+        postings = defaultdict(lambda: ([], []))
+        doc_lengths = []
+        for position, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            counts = defaultdict(int)
+            for token in tokens:
+                counts[token] += 1
+            for token, count in counts.items():
+                postings[token][0].append(position)
+                postings[token][1].append(count)
+
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if len(doc_lengths) else 0.0
+        num_docs = len(self.doc_ids)
+        self.postings = {}
+        for token, (positions, counts) in postings.items():
+            idf = np.log(1.0 + (num_docs - len(positions) + 0.5) / (len(positions) + 0.5))
+            self.postings[token] = (np.asarray(positions, dtype=np.int32), np.asarray(counts, dtype=np.float32), idf)
+
+    def search(self, query, k):
+        """Return up to k (doc_id, score) pairs with a positive score, best first."""
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for token in set(tokenize(query)):
+            if token not in self.postings:
+                continue
+            positions, counts, idf = self.postings[token]
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[positions] / self.avg_length)
+            scores[positions] += idf * counts * (self.k1 + 1.0) / (counts + norm)
+        candidates = np.flatnonzero(scores)
+        top = candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+        return [(self.doc_ids[i], float(scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    """Fuse several ranked lists of doc_ids: score(d) = sum over lists of 1 / (rrf_k + rank of d)."""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] += 1.0 / (rrf_k + rank)
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+class HybridRetriever:
+    """
+    Drop-in replacement for the MultiVectorRetriever used by JEEDocsEngine: invoke(query) returns the
+    top-k parent documents, ranked by RRF over the vector search and BM25 over the parent documents.
+    `lexical` is any index with search(query, k) -> [(doc_id, score)]; by default a BM25Index over the docstore.
+    """
+
+    def __init__(self, vectorstore, docstore, id_key="doc_id", k=4, fetch_k=20, rrf_k=60, lexical=None):
+        self.vectorstore = vectorstore
+        self.docstore = docstore
+        self.id_key = id_key
+        self.k = k
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+
+        if lexical is None:
+            doc_ids = list(docstore.yield_keys())
+            lexical = BM25Index(doc_ids, [str(doc) for doc in docstore.mget(doc_ids)])
+        self.lexical = lexical
+
+    def vector_ranking(self, query):
+        """Parent doc_ids ranked by vector search, with each parent's best relevance score (0-1, higher is closer)."""
+        # Several child vectors can point at the same parent: keep each parent at its best rank
+        ranking = []
+        scores = {}
+        for doc, score in self.vectorstore.similarity_search_with_relevance_scores(query, k=self.fetch_k):
+            doc_id = doc.metadata.get(self.id_key)
+            if doc_id is not None and doc_id not in scores:
+                ranking.append(doc_id)
+                scores[doc_id] = float(score)
+        return ranking, scores
+
+    def invoke_with_scores(self, query):
+        """Top-k parent documents as (document, vector relevance score) pairs; the score is None for BM25-only hits."""
+        vector_ranking, vector_scores = self.vector_ranking(query)
+        lexical_ranking = [doc_id for doc_id, _ in self.lexical.search(query, self.fetch_k)]
+        doc_ids = reciprocal_rank_fusion([vector_ranking, lexical_ranking], self.rrf_k)[:self.k]
+        return [
+            (doc, vector_scores.get(doc_id))
+            for doc_id, doc in zip(doc_ids, self.docstore.mget(doc_ids))
+            if doc is not None
+        ]
+
+    def invoke(self, query):
+        return [doc for doc, _ in self.invoke_with_scores(query)]
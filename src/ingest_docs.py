@@ -0,0 +1,191 @@
+# Offline ingestion pipeline for JEE Docs Chat.
+# Turns the information bulletin PDFs into the artifacts jee_docs_engine loads from vector_db/:
+#   advanced_vectorstore.faiss, advanced_vectorstore_metadata.pkl, advanced_docstore.json (+ .sqlite)
+#
+# Usage:
+#   python -m src.ingest_docs bulletins/jee_mains_2025.pdf bulletins/jee_advanced_2025.pdf
+#
+# - Pages are partitioned in parallel in a process pool (one task per page).
+# - Chunks are content-hashed: the hash is the doc_id, and embeddings are cached by hash, so re-running on an
+#   updated bulletin only embeds new/changed chunks. PDFs whose bytes did not change are not re-partitioned.
+# - Embedding calls are batched.
+# - Every artifact is written to a temp file and moved into place, so the chat never reads a half-written file.
+
+from langchain_community.vectorstores import FAISS
+from langchain_huggingface import HuggingFaceEmbeddings
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import faiss
+from pypdf import PdfReader, PdfWriter
+
+from src.sqlite_docstore import build_from_json
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))          # current directory
+TRUNK_DIR = os.path.abspath(os.path.join(CURRENT_DIR, '..'))      # Move up one level to reach the trunk
+VECTOR_DB = os.path.join(TRUNK_DIR, 'vector_db')
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+MANIFEST_FILE = "ingest_manifest.json"          # pdf hash -> ordered chunk ids
+EMBEDDING_CACHE_FILE = "ingest_embeddings.pkl"  # {"model": name, "vectors": {chunk id: vector}}
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_id(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+# --- PARTITIONING (runs in worker processes) ---
+
+def partition_page(pdf_path, page_number, strategy):
+    """Partition a single page (1-based) of a PDF; returns its unstructured elements."""
+    from unstructured.partition.pdf import partition_pdf
+
+    writer = PdfWriter()
+    writer.add_page(PdfReader(pdf_path).pages[page_number - 1])
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        writer.write(tmp)
+    try:
+        return partition_pdf(
+            filename=tmp.name,
+            strategy=strategy,
+            infer_table_structure=True,
+            starting_page_number=page_number,
+        )
+    finally:
+        os.remove(tmp.name)
+
+def partition_pdf_parallel(pdf_path, pool, strategy):
+    num_pages = len(PdfReader(pdf_path).pages)
+    futures = [pool.submit(partition_page, pdf_path, page, strategy) for page in range(1, num_pages + 1)]
+    elements = []
+    for future in futures:             # keep page order
+        elements.extend(future.result())
+    return elements
+
+def chunk_elements(elements, max_characters):
+    from unstructured.chunking.title import chunk_by_title
+
+    chunks = chunk_by_title(
+        elements,
+        max_characters=max_characters,
+        new_after_n_chars=int(max_characters * 0.8),
+        combine_text_under_n_chars=max_characters // 4,
+    )
+    return [chunk.text.strip() for chunk in chunks if chunk.text.strip()]
+
+# --- ARTIFACTS ---
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r") as f:
+        return json.load(f)
+
+def load_pickle(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def atomic_write(path, write_fn, mode="w"):
+    # Write next to the target and rename over it: readers see either the old or the new file
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, mode) as f:
+        write_fn(f)
+    os.replace(tmp_path, path)
+
+def write_vectorstore(vectorstore, out_dir):
+    index_path = f"{out_dir}/advanced_vectorstore.faiss"
+    tmp_index_path = f"{index_path}.tmp-{os.getpid()}"
+    faiss.write_index(vectorstore.index, tmp_index_path)
+
+    # Same layout jee_docs_engine.load_retriever expects: the index is stored separately and re-attached on load
+    index = vectorstore.index
+    vectorstore.index = None
+    try:
+        atomic_write(f"{out_dir}/advanced_vectorstore_metadata.pkl", lambda f: pickle.dump(vectorstore, f), mode="wb")
+    finally:
+        vectorstore.index = index
+    os.replace(tmp_index_path, index_path)
+
+def ingest(pdf_paths, out_dir=VECTOR_DB, workers=None, batch_size=64, max_characters=2000,
+           strategy="hi_res", embedding_model=DEFAULT_EMBEDDING_MODEL):
+    os.makedirs(out_dir, exist_ok=True)
+    old_docstore = load_json(f"{out_dir}/advanced_docstore.json", {})
+    old_manifest = load_json(f"{out_dir}/{MANIFEST_FILE}", {})
+    embedding_cache = load_pickle(f"{out_dir}/{EMBEDDING_CACHE_FILE}", {"model": embedding_model, "vectors": {}})
+    if embedding_cache["model"] != embedding_model:
+        print(f"Embedding model changed ({embedding_cache['model']} -> {embedding_model}); re-embedding everything")
+        embedding_cache = {"model": embedding_model, "vectors": {}}
+
+    # 1. Partition + chunk every PDF whose content changed since the last run
+    manifest = {}
+    docstore = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for pdf_path in pdf_paths:
+            pdf_hash = file_hash(pdf_path)
+            previous = old_manifest.get(pdf_hash)
+            if previous and all(doc_id in old_docstore for doc_id in previous["chunks"]):
+                print(f"{pdf_path}: unchanged, reusing {len(previous['chunks'])} chunks")
+                texts = [old_docstore[doc_id] for doc_id in previous["chunks"]]
+            else:
+                print(f"{pdf_path}: partitioning")
+                texts = chunk_elements(partition_pdf_parallel(pdf_path, pool, strategy), max_characters)
+            doc_ids = [chunk_id(text) for text in texts]
+            docstore.update(zip(doc_ids, texts))
+            manifest[pdf_hash] = {"source": os.path.basename(pdf_path), "chunks": doc_ids}
+
+    # 2. Embed only chunks that have no cached vector, in batches
+    embeddings = HuggingFaceEmbeddings(model_name=embedding_model)
+    vectors = embedding_cache["vectors"]
+    missing = [doc_id for doc_id in docstore if doc_id not in vectors]
+    print(f"{len(docstore)} chunks, {len(docstore) - len(missing)} cached, {len(missing)} to embed")
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        for doc_id, vector in zip(batch, embeddings.embed_documents([docstore[doc_id] for doc_id in batch])):
+            vectors[doc_id] = vector
+    # Drop vectors of chunks that no longer exist in any bulletin
+    embedding_cache["vectors"] = {doc_id: vectors[doc_id] for doc_id in docstore}
+
+    # 3. Build the vectorstore (one vector per chunk, doc_id pointing at the parent text in the docstore)
+    doc_ids = list(docstore)
+    vectorstore = FAISS.from_embeddings(
+        text_embeddings=[(docstore[doc_id], embedding_cache["vectors"][doc_id]) for doc_id in doc_ids],
+        embedding=embeddings,
+        metadatas=[{"doc_id": doc_id} for doc_id in doc_ids],
+    )
+
+    # 4. Write the artifacts. The docstore goes first: a reader that still has the old index only ever
+    # misses a parent document, which the MultiVectorRetriever skips.
+    atomic_write(f"{out_dir}/advanced_docstore.json", lambda f: json.dump(docstore, f))
+    build_from_json(f"{out_dir}/advanced_docstore.json", f"{out_dir}/advanced_docstore.sqlite")
+    write_vectorstore(vectorstore, out_dir)
+    atomic_write(f"{out_dir}/{EMBEDDING_CACHE_FILE}", lambda f: pickle.dump(embedding_cache, f), mode="wb")
+    atomic_write(f"{out_dir}/{MANIFEST_FILE}", lambda f: json.dump(manifest, f, indent=2))
+    print(f"Wrote {len(doc_ids)} chunks to {out_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the JEE Docs Chat vector_db from information bulletin PDFs.")
+    parser.add_argument("pdfs", nargs="+", help="bulletin PDFs to ingest (the full set: chunks of PDFs left out are dropped)")
+    parser.add_argument("--out", default=VECTOR_DB, help="output directory (default: vector_db/)")
+    parser.add_argument("--workers", type=int, default=None, help="partitioning processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks per embedding call")
+    parser.add_argument("--max-characters", type=int, default=2000, help="max characters per chunk")
+    parser.add_argument("--strategy", default="hi_res", help="unstructured partitioning strategy")
+    parser.add_argument("--embedding-model", default=DEFAULT_EMBEDDING_MODEL)
+    args = parser.parse_args()
+
+    ingest(args.pdfs, out_dir=args.out, workers=args.workers, batch_size=args.batch_size,
+           max_characters=args.max_characters, strategy=args.strategy, embedding_model=args.embedding_model)
@@ -0,0 +1,749 @@
+# JEE Docs Chat engine: the retriever and the LangGraph workflow behind module_5.
+# Built once per process (lazily, on first use) and shared by every Streamlit session.
+# Only the per-session thread_id - and the conversation checkpointed under it - differs between users.
+
+from langchain.storage import InMemoryStore
+from langchain.retrievers.multi_vector import MultiVectorRetriever
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, AIMessageChunk, SystemMessage
+from langchain.schema import Document
+from langchain_core.prompts import ChatPromptTemplate
+
+from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.memory import MemorySaver
+from typing import TypedDict, List, Optional
+from pydantic import BaseModel, Field
+
+import os
+import faiss
+import pickle
+import random
+import json
+import threading
+import time
+import contextvars
+from collections import Counter, deque
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from src.sqlite_docstore import SQLiteDocStore, SQLiteLexicalIndex, build_from_json, is_current
+from src.semantic_cache import SemanticCache
+from src.hybrid_retriever import HybridRetriever
+from src.chat_memory import open_checkpointer, ThreadExpiry
+from src.llm_gateway import get_llm
+
+# Hugging Face Token (llm_gateway has already loaded .env; not needed for offline runs with the local stand-in LLM)
+HF_TOKEN = os.getenv("HF_TOKEN")
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))          # current directory
+TRUNK_DIR = os.path.abspath(os.path.join(CURRENT_DIR, '..'))      # Move up one level to reach the trunk
+VECTOR_DB = os.path.join(TRUNK_DIR, 'vector_db')
+
+# How the corpus is held: "memory" loads the FAISS index and every parent document into RAM,
+# "disk" memory-maps the index and reads parent documents from SQLite only for the retrieved doc_ids
+DOCS_STORAGE = os.getenv("JEE_DOCS_STORAGE", "memory")
+
+# "hybrid" fuses BM25 over the parent documents with the vector search; "vector" is the plain MultiVectorRetriever
+RETRIEVAL_MODE = os.getenv("JEE_DOCS_RETRIEVAL", "hybrid")
+
+# Document grading: max grader calls in flight (shared by all sessions) and seconds allowed per call, counted from
+# when the call starts (get_engine() also gives the grader LLM this as its total deadline, retries included)
+GRADE_CONCURRENCY = int(os.getenv("GRADE_CONCURRENCY", "8"))
+GRADE_TIMEOUT = float(os.getenv("GRADE_TIMEOUT", "20"))
+
+# Grading fast path on the retriever's vector relevance score (0-1): at or above the accept score a chunk is
+# accepted and below the reject score rejected without an LLM call. Setting GRADE_ACCEPT_SCORE / GRADE_REJECT_SCORE
+# pins that side; unset (the default), it uses the thresholds fitted on this corpus, and is disabled until a fit exists.
+GRADE_ACCEPT_SCORE = float(os.environ["GRADE_ACCEPT_SCORE"]) if os.getenv("GRADE_ACCEPT_SCORE") else None
+GRADE_REJECT_SCORE = float(os.environ["GRADE_REJECT_SCORE"]) if os.getenv("GRADE_REJECT_SCORE") else None
+
+# Fitted thresholds: calibrate_grade_thresholds() over the LLM grades, re-run every GRADE_RECALIBRATE_EVERY logged
+# grades and saved to GRADE_THRESHOLDS_FILE, which get_engine() loads at start-up
+GRADE_THRESHOLDS_FILE = os.getenv("GRADE_THRESHOLDS_FILE", os.path.join(VECTOR_DB, 'grade_thresholds.json'))
+GRADE_RECALIBRATE_EVERY = int(os.getenv("GRADE_RECALIBRATE_EVERY", "200"))
+
+# Share of fast-path decisions also sent to the LLM grader in the background (the answer does not wait for them),
+# so the grade log - and the next fit - still sees chunks outside the ambiguous band
+GRADE_AUDIT_RATE = float(os.getenv("GRADE_AUDIT_RATE", "0.05"))
+
+# Semantic answer cache for first-turn questions: min cosine similarity for a hit, max entries, entry lifetime (s)
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(6 * 60 * 60)))
+
+# Conversation memory: checkpoint database, idle time (s) after which a conversation is deleted,
+# and approximate token budget for the history sent to the rewrite/answer prompts (older turns are summarised)
+CHAT_MEMORY_DB = os.getenv("CHAT_MEMORY_DB", os.path.join(TRUNK_DIR, 'chat_memory.sqlite'))
+CHAT_THREAD_TTL = float(os.getenv("CHAT_THREAD_TTL", str(24 * 60 * 60)))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+
+ANSWER_TEMPLATE = """
+    Answer the question based on the following context and the Chat history.
+    Especially take the latest question into consideration:
+
+    Chathistory: {history}
+    Context: {context}
+    Question: {question}
+
+    Only answer the question, don't mention in output like "Based on the context and chat history, I understand that you are asking about "
+
+    """
+
+# --- LANGGRAPH: STATE & SCHEMAS ---
+
+class AgentState(TypedDict):
+    messages: List[BaseMessage]
+    documents: List[Document]
+    # on_topic: str
+    rephrased_question: str
+    proceed_to_generate: bool
+    rephrase_count: int
+    question: HumanMessage
+    summary: str                        # rolling summary of turns that fell out of the history window
+    document_scores: List[Optional[float]]    # vector similarity of each document, None if unknown
+    question_embedding: List[float]     # only set for first-turn questions, when the answer cache is enabled
+    cached_answer: str
+
+class GradeQuestion(BaseModel):
+    score: str = Field(
+        description="Question is about the specified topics? If yes -> 'Yes' if not -> 'No'"
+    )
+
+class GradeDocument(BaseModel):
+    score: str = Field(
+        description="Document is relevant to the question? If yes -> 'Yes' if not -> 'No'"
+    )
+
+# --- RETRIEVAL STAGE ---
+
+def load_retriever(vector_db=VECTOR_DB, storage=DOCS_STORAGE, retrieval=RETRIEVAL_MODE):
+    if storage not in ("memory", "disk"):
+        raise ValueError(f"Unknown JEE_DOCS_STORAGE mode: {storage!r} (expected 'memory' or 'disk')")
+    if retrieval not in ("hybrid", "vector"):
+        raise ValueError(f"Unknown JEE_DOCS_RETRIEVAL mode: {retrieval!r} (expected 'hybrid' or 'vector')")
+
+    # Load FAISS index
+    if storage == "disk":
+        # Memory-mapped: pages are read on demand and shared between worker processes
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        index = faiss.read_index(f"{vector_db}/advanced_vectorstore.faiss", mmap_flag | faiss.IO_FLAG_READ_ONLY)
+    else:
+        index = faiss.read_index(f"{vector_db}/advanced_vectorstore.faiss")
+
+    # Load vectorstore metadata
+    with open(f"{vector_db}/advanced_vectorstore_metadata.pkl", "rb") as f:
+        vectorstore = pickle.load(f)
+
+    # Assign FAISS index back to vectorstore
+    vectorstore.index = index
+
+    # The storage layer for the parent documents
+    if storage == "disk":
+        # Converted from the JSON docstore (again whenever the JSON has changed); afterwards only looked up by doc_id
+        db_path = f"{vector_db}/advanced_docstore.sqlite"
+        json_path = f"{vector_db}/advanced_docstore.json"
+        if not is_current(json_path, db_path):
+            build_from_json(json_path, db_path)
+        store = SQLiteDocStore(db_path)
+        lexical = SQLiteLexicalIndex(db_path)
+    else:
+        store = InMemoryStore()
+
+        # Load stored documents (text & tables)
+        with open(f"{vector_db}/advanced_docstore.json", "r") as f:
+            doc_data = json.load(f)
+
+        # Restore data into docstore
+        store.mset(list(doc_data.items()))
+        lexical = None          # HybridRetriever builds its BM25 index from the in-memory documents
+
+    # The retriever
+    if retrieval == "hybrid":
+        return HybridRetriever(vectorstore=vectorstore, docstore=store, id_key="doc_id", lexical=lexical)
+    return MultiVectorRetriever(
+        vectorstore=vectorstore,
+        docstore=store,
+        id_key="doc_id"  # Ensure this matches how doc_ids were stored
+    )
+
+
+def calibrate_grade_thresholds(grade_log, precision=0.95, min_samples=50):
+    """
+    Fit (accept_score, reject_score) from (similarity score, LLM said yes, weight) entries, e.g.
+    JEEDocsEngine.grade_log; the weight (1 if omitted) is how many chunks the entry stands for, so audited
+    fast-path samples count as the whole band they were drawn from.
+    accept_score is the lowest score above which at least `precision` of the chunks were graded 'Yes';
+    reject_score the highest score below which at least `precision` were graded 'No'.
+    A side that cannot be fitted is returned as +inf / -inf (fast path disabled on that side).
+    """
+    if len(grade_log) < min_samples:
+        return float("inf"), float("-inf")
+    entries = sorted(grade_log)
+    scores = np.array([entry[0] for entry in entries], dtype=np.float64)
+    relevant = np.array([entry[1] for entry in entries], dtype=np.float64)
+    weights = np.array([entry[2] if len(entry) > 2 else 1.0 for entry in entries], dtype=np.float64)
+
+    # Weighted precision of 'Yes' among chunks at or above each score / of 'No' among chunks at or below each score
+    yes_above = np.cumsum((weights * relevant)[::-1])[::-1] / np.cumsum(weights[::-1])[::-1]
+    no_below = np.cumsum(weights * (1.0 - relevant)) / np.cumsum(weights)
+
+    # A threshold can only sit between distinct scores: evaluate accept at the first and reject at the last of ties
+    first_of_ties = np.r_[True, scores[1:] != scores[:-1]]
+    last_of_ties = np.r_[scores[1:] != scores[:-1], True]
+    accept = np.flatnonzero((yes_above >= precision) & first_of_ties)
+    reject = np.flatnonzero((no_below >= precision) & last_of_ties)
+    accept_score = scores[accept[0]] if len(accept) else float("inf")
+    # Rejection is strict (score < reject_score), so the threshold sits just above the last safe score
+    reject_score = np.nextafter(scores[reject[-1]], np.inf) if len(reject) else float("-inf")
+    # The two bands must not overlap; where they would, the accept side wins
+    return float(accept_score), float(min(reject_score, accept_score))
+
+
+def load_grade_thresholds(path):
+    """(accept_score, reject_score) saved by save_grade_thresholds(), or (inf, -inf) if nothing has been fitted yet."""
+    try:
+        with open(path, "r") as f:
+            fitted = json.load(f)
+        return float(fitted["accept_score"]), float(fitted["reject_score"])
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return float("inf"), float("-inf")
+
+def save_grade_thresholds(path, accept_score, reject_score, samples):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump({"accept_score": accept_score, "reject_score": reject_score, "samples": samples,
+                   "fitted_at": time.time()}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class TimedCall:
+    """
+    A call to run on a thread pool that records when it starts, so its timeout can be counted from then rather than
+    from when it was queued behind other sessions' calls.
+    """
+
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+        self.started = threading.Event()
+        self.started_at = None
+
+    def __call__(self):
+        self.started_at = time.monotonic()
+        self.started.set()
+        return self.fn(*self.args)
+
+    def result(self, future, timeout):
+        """future.result(), allowing `timeout` seconds from the start of the call."""
+        self.started.wait()
+        return future.result(timeout=max(0.0, self.started_at + timeout - time.monotonic()))
+
+
+def approx_tokens(messages):
+    # ~4 characters per token, plus a little per-message overhead; good enough for a budget
+    return sum(len(str(message.content)) // 4 + 4 for message in messages)
+
+
+class JEEDocsEngine:
+    """
+    Retriever + compiled LangGraph workflow for JEE Docs Chat.
+
+    Holds no per-user state: conversations are kept by the checkpointer under the thread_id passed to ask().
+    """
+
+    def __init__(self, llm, retriever, checkpointer=None,
+                 grade_concurrency=GRADE_CONCURRENCY, grade_timeout=GRADE_TIMEOUT, answer_cache=None,
+                 accept_score=GRADE_ACCEPT_SCORE, reject_score=GRADE_REJECT_SCORE,
+                 history_token_budget=HISTORY_TOKEN_BUDGET, thread_expiry=None, grader_llm=None,
+                 thresholds_file=None, recalibrate_every=GRADE_RECALIBRATE_EVERY, audit_rate=GRADE_AUDIT_RATE):
+        self.llm = llm
+        # Model for the per-chunk grading calls; should enforce grade_timeout itself, since a call that has
+        # started cannot be cancelled and would otherwise hold its grader_pool worker
+        self.grader_llm = grader_llm if grader_llm is not None else llm
+        self.retriever = retriever
+        self.answer_cache = answer_cache       # optional SemanticCache shared by all sessions
+        self.grade_concurrency = grade_concurrency
+        self.grade_timeout = grade_timeout
+        self.history_token_budget = history_token_budget
+        self.thread_expiry = thread_expiry     # optional ThreadExpiry for the checkpointer
+        # Fast-path thresholds: a side given here is pinned, the other comes from (and is refit into) thresholds_file
+        self.thresholds_file = thresholds_file
+        fitted = load_grade_thresholds(thresholds_file) if thresholds_file else (float("inf"), float("-inf"))
+        self.pinned = (accept_score is not None, reject_score is not None)
+        self.accept_score = accept_score if accept_score is not None else fitted[0]
+        self.reject_score = reject_score if reject_score is not None else fitted[1]
+        self.recalibrate_every = recalibrate_every
+        self.audit_rate = audit_rate
+        self.grade_log = deque(maxlen=2000)    # (similarity score, LLM said yes, weight) entries
+        self._logged_since_fit = 0
+        self._calibration_lock = threading.Lock()
+        self.grader_pool = ThreadPoolExecutor(max_workers=grade_concurrency, thread_name_prefix="retrieval_grader")
+        self.rag_chain = ChatPromptTemplate.from_template(ANSWER_TEMPLATE) | llm
+        self.checkpointer = checkpointer if checkpointer is not None else MemorySaver()
+        self.counters = Counter()              # questions, llm_calls, refine_loops, ... across all sessions
+        self._counters_lock = threading.Lock()
+        self.graph = self.build_graph()
+
+    def count(self, name, n=1):
+        with self._counters_lock:
+            self.counters[name] += n
+
+    def stats(self):
+        """Counters since start-up, plus LLM calls per question."""
+        with self._counters_lock:
+            stats = dict(self.counters)
+        questions = stats.get("questions", 0)
+        stats["llm_calls_per_question"] = stats.get("llm_calls", 0) / questions if questions else 0.0
+        return stats
+
+    def recalibrate(self):
+        """
+        Refit the fast-path thresholds on grade_log and apply them to the sides that are not pinned; saved to
+        thresholds_file (if any) for the next start. Returns the fitted (accept, reject), or None if the log is too short.
+        """
+        with self._calibration_lock:
+            self._logged_since_fit = 0
+            grade_log = list(self.grade_log)
+            accept_score, reject_score = calibrate_grade_thresholds(grade_log)
+            if accept_score == float("inf") and reject_score == float("-inf"):
+                return None
+            if not self.pinned[0]:
+                self.accept_score = accept_score
+            if not self.pinned[1]:
+                self.reject_score = reject_score
+            if self.thresholds_file:
+                save_grade_thresholds(self.thresholds_file, accept_score, reject_score, len(grade_log))
+            print(f"recalibrate: accept >= {accept_score:.3f}, reject < {reject_score:.3f} ({len(grade_log)} grades)")
+            return accept_score, reject_score
+
+    def compact_history(self, state: AgentState):
+        """
+        Keep state["messages"] within the history token budget: once it is exceeded, the oldest turns are folded
+        into state["summary"] (one LLM call) and dropped, leaving the latest turns worth about half the budget.
+        """
+        messages = state["messages"]
+        if approx_tokens(messages) <= self.history_token_budget:
+            return
+
+        keep = 1                                  # always keep the current question
+        while keep < len(messages) and approx_tokens(messages[-(keep + 1):]) <= self.history_token_budget // 2:
+            keep += 1
+        dropped, kept = messages[:-keep], messages[-keep:]
+
+        transcript = "\n".join(f"{message.type}: {message.content}" for message in dropped)
+        summary_prompt = [
+            SystemMessage(
+                content="""You maintain a short running summary of a conversation between a student and a JEE information assistant.
+    Update the summary with the new turns. Keep facts the student may refer back to (exam, category, dates, numbers). At most 120 words."""
+            ),
+            HumanMessage(content=f"Current summary:\n{state.get('summary') or '(none)'}\n\nNew turns:\n{transcript}"),
+        ]
+        response = self.llm.invoke(summary_prompt)
+        self.count("llm_calls")
+        self.count("history_compactions")
+        state["summary"] = response.content.strip()[:self.history_token_budget * 2]   # hard cap, ~half the budget
+        state["messages"] = kept
+        print(f"compact_history: summarised {len(dropped)} messages, kept {len(kept)}")
+
+    def history_with_summary(self, state: AgentState, messages):
+        if state.get("summary"):
+            return [SystemMessage(content=f"Summary of the earlier conversation: {state['summary']}")] + messages
+        return messages
+
+    # --- LANGGRAPH: DEFINING THE NODES ---
+
+    def question_rewriter(self, state: AgentState):
+        print(f"Entering question_rewriter with following state: {state}")
+        self.count("questions")
+
+        # Reset state variables except for 'question' and 'messages'
+        state["documents"] = []
+        state["document_scores"] = []
+        state["on_topic"] = ""
+        state["rephrased_question"] = ""
+        state["proceed_to_generate"] = False
+        state["rephrase_count"] = 0
+        state["question_embedding"] = None
+        state["cached_answer"] = ""
+
+        if "messages" not in state or state["messages"] is None:
+            state["messages"] = []
+
+        if state["question"] not in state["messages"]:
+            state["messages"].append(state["question"])
+
+        self.compact_history(state)
+
+        if len(state["messages"]) > 1 or state.get("summary"):
+            conversation = state["messages"][:-1]     # getting the conversations before the last message (question)
+            current_question = state["question"].content
+            messages = [
+                SystemMessage(
+                    content="""
+                    You are a helpful assistant that rephrases the user's question to be a standalone question optimized for retrieval from the JEE Advanced Information.
+                    """
+                )
+            ]
+            messages.extend(self.history_with_summary(state, conversation))   # adding the conversation history after the system messages, followed by the question
+            messages.append(HumanMessage(content=current_question))
+            rephrase_prompt = ChatPromptTemplate.from_messages(messages)
+            prompt = rephrase_prompt.format()         # instead of above lines, can replace with single prompt with placeholders for question and chat history
+            response = self.llm.invoke(prompt)
+            self.count("llm_calls")
+            better_question = response.content.strip()
+            print(f"question_rewriter: Rephrased question: {better_question}")
+            state["rephrased_question"] = better_question
+        else:
+            state["rephrased_question"] = state["question"].content
+        return state
+
+    # Only a first-turn question (no history to depend on) can be answered from the semantic cache
+    def cache_lookup(self, state: AgentState):
+        print("Entering cache_lookup")
+        if self.answer_cache is not None and len(state["messages"]) == 1 and not state.get("summary"):
+            vector = self.answer_cache.embed(state["rephrased_question"])
+            cached_answer = self.answer_cache.get(vector)
+            if cached_answer is not None:
+                state["cached_answer"] = cached_answer
+            else:
+                state["question_embedding"] = vector.tolist()
+            print(f"cache_lookup: hit = {cached_answer is not None}")
+        return state
+
+    def cache_router(self, state: AgentState):
+        return "serve_cached_answer" if state.get("cached_answer") else "retrieve"
+
+    def serve_cached_answer(self, state: AgentState):
+        print("Entering serve_cached_answer")
+        state["messages"].append(AIMessage(content=state["cached_answer"]))
+        state["cached_answer"] = ""
+        return state
+
+    def retrieve(self, state: AgentState):
+        print("Entering retrieve")
+        if hasattr(self.retriever, "invoke_with_scores"):
+            scored = self.retriever.invoke_with_scores(state["rephrased_question"])
+            documents = [doc for doc, _ in scored]
+            scores = [score for _, score in scored]
+        else:
+            documents = self.retriever.invoke(state["rephrased_question"])
+            scores = [None] * len(documents)
+        print(f"retrieve: Retrieved {len(documents)} documents")
+        state["documents"] = documents
+        state["document_scores"] = scores
+        return state
+
+    # The retrieval_grader checks the relevancy of each retrieved chunk.
+    # Chunks whose vector similarity is clearly high (>= accept_score) or clearly low (< reject_score) are decided
+    # without the LLM; the ambiguous band is graded concurrently on the shared grader pool, so it costs about one round-trip.
+    # A random audit_rate share of the fast-path chunks is graded as well, in the background, only for the grade log.
+    def retrieval_grader(self, state: AgentState):
+        print("Entering retrieval_grader")
+        system_message = SystemMessage(
+            content="""You are a grader assessing the relevance of a retrieved document to a user question.
+    Only answer with 'Yes' or 'No'.
+
+    If the document contains information relevant to the user's question, respond with 'Yes'.
+    Otherwise, respond with 'No'."""
+        )
+
+        structured_llm = self.grader_llm.with_structured_output(GradeDocument)
+
+        documents = state["documents"]
+        scores = state.get("document_scores") or [None] * len(documents)
+        grades = [None] * len(documents)         # printable verdicts
+        is_relevant = [False] * len(documents)
+        futures = {}
+
+        def submit(doc):
+            human_message = HumanMessage(
+                # content=f"User question: {state['rephrased_question']}\n\nRetrieved document:\n{doc.page_content}"
+                content=f"User question: {state['rephrased_question']}\n\nRetrieved document:\n{doc}"
+            )
+            grade_prompt = ChatPromptTemplate.from_messages([system_message, human_message])
+            grader_llm = grade_prompt | structured_llm
+            # copy_context() keeps LangGraph/LangChain callbacks attached to calls made from pool threads
+            call = TimedCall(contextvars.copy_context().run, grader_llm.invoke, {})
+            return call, self.grader_pool.submit(call)
+
+        audits = 0
+        for i, (doc, score) in enumerate(zip(documents, scores)):
+            fast = None
+            if score is not None and self.accept_score is not None and score >= self.accept_score:
+                grades[i] = f"Yes (score {score:.2f})"
+                is_relevant[i] = True
+                fast = "fast_accepted"
+            elif score is not None and self.reject_score is not None and score < self.reject_score:
+                grades[i] = f"No (score {score:.2f})"
+                fast = "fast_rejected"
+            if fast is None:
+                futures[i] = submit(doc)
+                continue
+            self.count(fast)
+            if self.audit_rate and random.random() < self.audit_rate:
+                # Logged when it finishes, weighted as the 1 / audit_rate fast-path chunks it stands for
+                _, future = submit(doc)
+                future.add_done_callback(lambda f, score=score: self.log_audit(f, score))
+                audits += 1
+
+        self.count("llm_calls", len(futures) + audits)
+        self.count("grade_audits", audits)
+        self.count("grader_calls_saved", len(documents) - len(futures))
+
+        # Each call gets grade_timeout seconds from when it starts, however long it queued for a free worker
+        # (the queue drains, because the grader LLM gives up on every call within its own deadline)
+        for i, (call, future) in futures.items():
+            try:
+                grades[i] = call.result(future, self.grade_timeout).score.strip()
+            except TimeoutError:
+                # A grader that does not answer in time is treated as 'No'
+                grades[i] = "No (timed out)"
+                continue
+            except Exception as error:
+                # So is one whose call failed (e.g. the request itself timed out or was refused)
+                grades[i] = f"No ({type(error).__name__})"
+                continue
+            is_relevant[i] = grades[i].lower() == "yes"
+            if scores[i] is not None:
+                # LLM verdicts against similarity scores, for calibrate_grade_thresholds()
+                self.log_grade(scores[i], is_relevant[i])
+
+        relevant_docs = []
+        for doc, grade, relevant in zip(documents, grades, is_relevant):
+            print(
+                # f"Grading document: {doc.page_content[:30]}... Result: {grade}"
+                f"Grading document: {doc[:30]}... Result: {grade}"
+            )
+            if relevant:
+                relevant_docs.append(doc)
+        state["documents"] = relevant_docs          # updating all docs with only the relevant set of docs
+        state["document_scores"] = []
+        state["proceed_to_generate"] = len(relevant_docs) > 0
+        print(f"retrieval_grader: proceed_to_generate = {state['proceed_to_generate']}")
+        return state
+
+    def log_grade(self, score, is_yes, weight=1.0):
+        """Record an LLM grade against the chunk's similarity score; refit the thresholds every recalibrate_every."""
+        self.grade_log.append((score, is_yes, weight))
+        with self._counters_lock:
+            self._logged_since_fit += 1
+            due = self.recalibrate_every and self._logged_since_fit >= self.recalibrate_every
+            if due:
+                self._logged_since_fit = 0
+        if due:
+            self.recalibrate()
+
+    def log_audit(self, future, score):
+        """Done-callback of an audit grading call: log its verdict (a failed or cancelled audit is just dropped)."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.log_grade(score, future.result().score.strip().lower() == "yes", weight=1.0 / self.audit_rate)
+
+    def proceed_router(self, state: AgentState):
+        print("Entering proceed_router")
+        rephrase_count = state.get("rephrase_count", 0)
+        if state.get("proceed_to_generate", False):
+            print("Routing to generate_answer")
+            return "generate_answer"
+        elif rephrase_count >= 2:
+            print("Maximum rephrase attempts reached. Cannot find relevant documents.")
+            return "cannot_answer"
+        else:
+            print("Routing to refine_question")
+            return "refine_question"
+
+    def refine_question(self, state: AgentState):
+        print("Entering refine_question")
+        rephrase_count = state.get("rephrase_count", 0)
+        if rephrase_count >= 2:
+            print("Maximum rephrase attempts reached")
+            return state
+        question_to_refine = state["rephrased_question"]
+        system_message = SystemMessage(
+            content="""You are a helpful assistant that slightly refines the user's question to improve retrieval results.
+    Provide a slightly adjusted version of the question."""
+        )
+        human_message = HumanMessage(
+            content=f"Original question: {question_to_refine}\n\nProvide a slightly refined question."
+        )
+        refine_prompt = ChatPromptTemplate.from_messages([system_message, human_message])
+        prompt = refine_prompt.format()
+        response = self.llm.invoke(prompt)
+        self.count("llm_calls")
+        self.count("refine_loops")
+        refined_question = response.content.strip()
+        print(f"refine_question: Refined question: {refined_question}")
+        state["rephrased_question"] = refined_question
+        state["rephrase_count"] = rephrase_count + 1
+        return state
+
+    # generate_answer: If at least 1 retrieved chunk is relevant to the question, generate the answer
+    # If for more then n (say 3) loops the refine question-retrieval loop doesn't retrieve relevant chunks, then go to cannot_answer.
+
+    def generate_answer(self, state: AgentState):
+        print("Entering generate_answer")
+        if "messages" not in state or state["messages"] is None:
+            raise ValueError("State must include 'messages' before generating an answer.")
+
+        history = self.history_with_summary(state, state["messages"])
+        documents = state["documents"]
+        rephrased_question = state["rephrased_question"]
+
+        formatted_context = "\n\n".join(doc for doc in documents)
+
+        response = self.rag_chain.invoke(
+            {"history": history, "context": formatted_context, "question": rephrased_question}
+        )
+
+        self.count("llm_calls")
+        generation = response.content.strip()
+
+        state["messages"].append(AIMessage(content=generation))
+        print(f"generate_answer: Generated response: {generation}")
+
+        if state.get("question_embedding") is not None:
+            self.answer_cache.put(np.asarray(state["question_embedding"], dtype=np.float32), generation)
+            state["question_embedding"] = None
+
+        # Retrieved documents are not needed after answering; keep them out of the persisted checkpoint
+        state["documents"] = []
+        return state
+
+    def cannot_answer(self, state: AgentState):
+        print("Entering cannot_answer")
+        if "messages" not in state or state["messages"] is None:
+            state["messages"] = []
+        state["messages"].append(
+            AIMessage(
+                content="I'm sorry, but I cannot find the information you're looking for."
+            )
+        )
+        state["question_embedding"] = None
+        return state
+
+    # --- LANGGRAPH: BUILDING THE GRAPH ---
+
+    def build_graph(self):
+        workflow = StateGraph(AgentState)
+
+        workflow.add_node("question_rewriter", self.question_rewriter)
+        workflow.add_node("cache_lookup", self.cache_lookup)
+        workflow.add_node("serve_cached_answer", self.serve_cached_answer)
+        workflow.add_node("retrieve", self.retrieve)
+        workflow.add_node("retrieval_grader", self.retrieval_grader)
+        workflow.add_node("generate_answer", self.generate_answer)
+        workflow.add_node("refine_question", self.refine_question)
+        workflow.add_node("cannot_answer", self.cannot_answer)
+
+        workflow.add_edge("question_rewriter", "cache_lookup")
+        workflow.add_conditional_edges(
+            "cache_lookup",
+            self.cache_router,
+            {
+                "serve_cached_answer": "serve_cached_answer",
+                "retrieve": "retrieve",
+            },
+        )
+        workflow.add_edge("serve_cached_answer", END)
+        workflow.add_edge("retrieve", "retrieval_grader")
+
+        workflow.add_conditional_edges(
+            "retrieval_grader",
+            self.proceed_router,
+            {
+                "generate_answer": "generate_answer",
+                "refine_question": "refine_question",
+                "cannot_answer": "cannot_answer",
+            },
+        )
+        workflow.add_edge("refine_question", "retrieve")
+        workflow.add_edge("generate_answer", END)
+        workflow.add_edge("cannot_answer", END)
+
+        workflow.set_entry_point("question_rewriter")
+
+        return workflow.compile(checkpointer=self.checkpointer)
+
+    # --- QUERY, RETRIEVAL & GENERATION---
+
+    def ask(self, question, thread_id):
+        if self.thread_expiry is not None:
+            self.thread_expiry.touch(thread_id)
+        input_data = {"question": HumanMessage(content=question)}
+        response = self.graph.invoke(input=input_data,
+                                     config={"configurable": {"thread_id": thread_id}})
+        return response['messages'][-1].content
+
+    def stream_answer(self, question, thread_id):
+        """
+        Run the graph and yield the answer as it is generated.
+        Tokens of generate_answer are streamed; a cached or 'cannot answer' reply is yielded whole.
+        The complete answer is appended to the thread's message history either way.
+        """
+        if self.thread_expiry is not None:
+            self.thread_expiry.touch(thread_id)
+        input_data = {"question": HumanMessage(content=question)}
+        config = {"configurable": {"thread_id": thread_id}}
+        streamed = False
+        for chunk, metadata in self.graph.stream(input=input_data, config=config, stream_mode="messages"):
+            # Only token chunks of the answer itself, not rewrites/grades or the final full message
+            if metadata.get("langgraph_node") == "generate_answer" and isinstance(chunk, AIMessageChunk) and chunk.content:
+                streamed = True
+                yield chunk.content
+        if not streamed:
+            yield self.graph.get_state(config).values["messages"][-1].content
+
+
+# --- PROCESS-WIDE ENGINE ---
+
+_engine = None
+_engine_lock = threading.Lock()
+
+# Timings (seconds) of the one-off build, filled in by get_engine()
+startup_stats = {}
+
+def get_engine():
+    """
+    Return the process-wide JEEDocsEngine, building it on first use.
+    Thread-safe: concurrent first calls from several sessions build the engine only once.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                start = time.perf_counter()
+                retriever = load_retriever()
+                loaded = time.perf_counter()
+                llm = get_llm()
+                grader_llm = get_llm(timeout=GRADE_TIMEOUT, deadline=GRADE_TIMEOUT)
+                answer_cache = SemanticCache(
+                    retriever.vectorstore.embeddings.embed_query,
+                    threshold=ANSWER_CACHE_THRESHOLD,
+                    max_size=ANSWER_CACHE_SIZE,
+                    ttl=ANSWER_CACHE_TTL,
+                )
+                checkpointer = open_checkpointer(CHAT_MEMORY_DB)
+                engine = JEEDocsEngine(llm, retriever, checkpointer=checkpointer, answer_cache=answer_cache,
+                                       thread_expiry=ThreadExpiry(checkpointer, ttl=CHAT_THREAD_TTL),
+                                       grader_llm=grader_llm, thresholds_file=GRADE_THRESHOLDS_FILE)
+                built = time.perf_counter()
+                startup_stats["index_load_s"] = loaded - start
+                startup_stats["graph_compile_s"] = built - loaded
+                startup_stats["cold_start_s"] = built - start
+                _engine = engine
+    return _engine
+
+
+if __name__ == "__main__":
+    # Measure cold (first call builds everything) vs warm (shared engine is reused) startup
+    start = time.perf_counter()
+    get_engine()
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_engine()
+    warm = time.perf_counter() - start
+
+    print(f"index load:    {startup_stats['index_load_s'] * 1000:.1f} ms")
+    print(f"graph compile: {startup_stats['graph_compile_s'] * 1000:.1f} ms")
+    print(f"cold start:    {cold * 1000:.1f} ms")
+    print(f"warm start:    {warm * 1e6:.1f} us")
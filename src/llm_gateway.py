@@ -0,0 +1,250 @@
+# One LLM client layer for every page.
+# .env is loaded once here, and chat models are created on first use rather than at import time, so opening a page
+# that never calls the LLM costs nothing. All Groq models share one pooled keep-alive httpx client, time out after
+# LLM_TIMEOUT seconds per request, and retry transient failures (connection errors, 408/409/429/5xx) up to
+# LLM_MAX_RETRIES times with exponential backoff and jitter, honouring Retry-After. The retries are done here rather
+# than by the groq SDK so that a whole call - every attempt plus the waits between them - ends within LLM_DEADLINE
+# seconds: each attempt's timeout is cut to the time left, and no retry starts that could not finish in time.
+#
+# LLM_BACKEND=local swaps in the deterministic LocalStandInLLM for tests and offline runs; use_backend() does the
+# same from code, and register_backend() plugs in any other factory.
+
+import asyncio
+import os
+import random
+import threading
+import time
+import groq
+import httpx
+from langchain_groq import ChatGroq
+
+# take environment variables from .env
+from dotenv import load_dotenv
+load_dotenv()
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3-70b-8192")
+
+# Seconds per request (the read timeout; connecting gets at most LLM_CONNECT_TIMEOUT), and retries per call
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+# Seconds a whole call may take, across all its attempts and backoff waits
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "120"))
+
+# A retry is skipped when less than this would be left of the deadline for it
+MIN_ATTEMPT_SECONDS = 1.0
+
+# Keep-alive connections shared by every session of the process
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+
+# Simulated latency of the local stand-in, in seconds
+LOCAL_LLM_LATENCY = float(os.getenv("LOCAL_LLM_LATENCY", "0"))
+
+# Statuses worth retrying besides 5xx; connection errors and timeouts are retried too
+RETRY_STATUSES = {408, 409, 429}
+
+_models = {}            # (backend, temperature, timeout, deadline) -> chat model
+_clients = {}           # 'sync' / 'async' -> pooled httpx client
+_lock = threading.Lock()
+_backend = LLM_BACKEND
+
+def http_timeout(timeout):
+    return httpx.Timeout(timeout, connect=min(LLM_CONNECT_TIMEOUT, timeout))
+
+def http_clients():
+    """The process-wide pooled (sync, async) httpx clients, created on first use."""
+    if not _clients:
+        limits = httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE,
+                              keepalive_expiry=LLM_KEEPALIVE_SECONDS)
+        _clients['async'] = httpx.AsyncClient(limits=limits, timeout=http_timeout(LLM_TIMEOUT))
+        _clients['sync'] = httpx.Client(limits=limits, timeout=http_timeout(LLM_TIMEOUT))
+    return _clients['sync'], _clients['async']
+
+def is_transient(error):
+    if isinstance(error, groq.APIConnectionError):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status in RETRY_STATUSES or status >= 500)
+
+def retry_delay(error, attempt):
+    """Seconds to wait before retry number `attempt` (0-based): the server's Retry-After, else backoff with jitter."""
+    response = getattr(error, "response", None)
+    try:
+        retry_after = float(response.headers.get("retry-after"))
+        if 0 <= retry_after <= 60:
+            return retry_after
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return min(0.5 * 2 ** attempt, 8.0) * (1 - 0.25 * random.random())
+
+
+class Deadline:
+    """The time budget of one call: how long an attempt may take now, and whether a retry still fits."""
+
+    def __init__(self, seconds, attempt_timeout, retries):
+        self.seconds = seconds
+        self.end = time.monotonic() + seconds
+        self.attempt_timeout = attempt_timeout
+        self.retries = retries
+
+    def remaining(self):
+        return self.end - time.monotonic()
+
+    def check(self):
+        if self.remaining() <= 0:
+            raise TimeoutError(f"LLM call exceeded its {self.seconds:g}s deadline")
+
+    def timeout(self):
+        """httpx timeout for the next attempt; TimeoutError if the budget is already spent."""
+        self.check()
+        return http_timeout(min(self.attempt_timeout, self.remaining()))
+
+    def retry_wait(self, error, attempt):
+        """Seconds to wait before retrying after `error`, or None if the call should fail with it."""
+        if attempt >= self.retries or not is_transient(error):
+            return None
+        delay = retry_delay(error, attempt)
+        # Retry only if the wait leaves time for a real attempt
+        return delay if delay + MIN_ATTEMPT_SECONDS < self.remaining() else None
+
+
+class DeadlineChatGroq(ChatGroq):
+    """
+    ChatGroq with the retries of llm_gateway instead of the SDK's (the SDK client is built with max_retries=0), so
+    that each call ends within `deadline` seconds. bind(deadline=...) overrides it for one runnable.
+    """
+
+    deadline: float = LLM_DEADLINE
+    retries: int = LLM_MAX_RETRIES
+    attempt_timeout: float = LLM_TIMEOUT
+
+    def call_deadline(self, kwargs):
+        return Deadline(kwargs.pop("deadline", None) or self.deadline, self.attempt_timeout, self.retries)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        deadline = self.call_deadline(kwargs)
+        for attempt in range(deadline.retries + 1):
+            try:
+                return super()._generate(messages, stop, run_manager, timeout=deadline.timeout(), **kwargs)
+            except Exception as error:
+                wait = deadline.retry_wait(error, attempt)
+                if wait is None:
+                    raise
+                time.sleep(wait)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        deadline = self.call_deadline(kwargs)
+        for attempt in range(deadline.retries + 1):
+            try:
+                return await super()._agenerate(messages, stop, run_manager, timeout=deadline.timeout(), **kwargs)
+            except Exception as error:
+                wait = deadline.retry_wait(error, attempt)
+                if wait is None:
+                    raise
+                await asyncio.sleep(wait)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        # A stream is retried only until its first chunk; after that the deadline just cuts it off
+        deadline = self.call_deadline(kwargs)
+        for attempt in range(deadline.retries + 1):
+            started = False
+            try:
+                for chunk in super()._stream(messages, stop, run_manager, timeout=deadline.timeout(), **kwargs):
+                    started = True
+                    yield chunk
+                    deadline.check()
+                return
+            except Exception as error:
+                wait = None if started else deadline.retry_wait(error, attempt)
+                if wait is None:
+                    raise
+                time.sleep(wait)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        deadline = self.call_deadline(kwargs)
+        for attempt in range(deadline.retries + 1):
+            started = False
+            try:
+                async for chunk in super()._astream(messages, stop, run_manager, timeout=deadline.timeout(),
+                                                    **kwargs):
+                    started = True
+                    yield chunk
+                    deadline.check()
+                return
+            except Exception as error:
+                wait = None if started else deadline.retry_wait(error, attempt)
+                if wait is None:
+                    raise
+                await asyncio.sleep(wait)
+
+
+def groq_model(temperature, timeout, deadline):
+    http_client, http_async_client = http_clients()
+    kwargs = {} if temperature is None else {'temperature': temperature}
+    return DeadlineChatGroq(model=LLM_MODEL, groq_api_key=os.getenv("GROQ_API_KEY"), timeout=http_timeout(timeout),
+                            max_retries=0, http_client=http_client, http_async_client=http_async_client,
+                            deadline=deadline, retries=LLM_MAX_RETRIES, attempt_timeout=timeout, **kwargs)
+
+def local_model(temperature, timeout, deadline):
+    from src.local_llm import LocalStandInLLM
+
+    return LocalStandInLLM(latency=LOCAL_LLM_LATENCY)
+
+# backend name -> factory(temperature, timeout, deadline) returning a LangChain chat model
+BACKENDS = {
+    'groq': groq_model,
+    'local': local_model,
+}
+
+def register_backend(name, factory):
+    BACKENDS[name] = factory
+
+def use_backend(name):
+    """Switch every later get_llm() call to another backend (models already handed out are unaffected)."""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"unknown LLM backend {name!r}; expected one of {sorted(BACKENDS)}")
+    with _lock:
+        _backend = name
+
+class RateLimiter:
+    """
+    Spaces calls at least 60 / requests_per_minute seconds apart across all threads that share it (for bulk jobs,
+    so a burst of workers stays under the provider's rate limit instead of relying on 429 retries).
+    """
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def chat_messages(system_prompt, user_input):
+    """The [system, user] message list every page sends to the chat model."""
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_input}]
+
+def get_llm(temperature=None, timeout=None, deadline=None):
+    """
+    The shared chat model for `temperature` (None: the backend's default), per-request `timeout` in seconds
+    (None: LLM_TIMEOUT) and total per-call `deadline` in seconds (None: LLM_DEADLINE, but never less than one attempt),
+    created on the first call. Callers with the same settings share one model.
+    """
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+    deadline = max(LLM_DEADLINE, timeout) if deadline is None else deadline
+    key = (_backend, temperature, timeout, deadline)
+    if key in _models:
+        return _models[key]
+    with _lock:
+        if key not in _models:
+            _models[key] = BACKENDS[key[0]](temperature, timeout, deadline)
+    return _models[key]
@@ -0,0 +1,84 @@
+# Deterministic local stand-in for the Groq chat model.
+# Lets the LangGraph pipelines run (and be benchmarked) offline: every call sleeps for a configurable latency,
+# is counted, and returns a reply derived from the prompt alone, so repeated runs make exactly the same decisions.
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+
+import re
+import threading
+import time
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:[-/.][a-z0-9]+)*")
+
+def content_words(text):
+    return {word for word in WORD_PATTERN.findall(text.lower()) if len(word) > 3}
+
+
+class LocalStandInLLM(BaseChatModel):
+    """
+    Chat model that answers from the prompt itself:
+    - rewrite/refine prompts get the (latest) question back,
+    - structured grading ('User question: ... Retrieved document: ...') says 'Yes' when at least
+      `relevance_overlap` of the question's content words appear in the document,
+    - anything else gets the first `answer_chars` characters of the last message.
+    """
+
+    latency: float = 0.0            # seconds per call (before the first token when streaming)
+    relevance_overlap: float = 0.5
+    answer_chars: int = 400
+
+    _calls: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self):
+        return "local-stand-in"
+
+    @property
+    def calls(self):
+        return self._calls
+
+    def _record_call(self):
+        with self._lock:
+            self._calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _reply(self, messages):
+        text = str(messages[-1].content)
+        if "Original question:" in text:
+            # refine_question: "Original question: ...\n\nProvide a slightly refined question."
+            return text.split("Original question:", 1)[1].split("\n\n", 1)[0].strip()
+        if "\nHuman: " in text:
+            # question_rewriter sends a formatted transcript: answer with the latest question
+            return text.rsplit("\nHuman: ", 1)[1].strip()
+        return text.strip()[:self.answer_chars]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._record_call()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._record_call()
+        for word in re.split(r"(\s+)", self._reply(messages)):
+            if not word:
+                continue
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+            if run_manager:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+    def grade(self, prompt_value, schema):
+        self._record_call()
+        text = prompt_value.to_messages()[-1].content
+        question, _, document = text.partition("Retrieved document:")
+        question_words = content_words(question.replace("User question:", ""))
+        overlap = len(question_words & content_words(document)) / len(question_words) if question_words else 0.0
+        return schema(score="Yes" if overlap >= self.relevance_overlap else "No")
+
+    def with_structured_output(self, schema, **kwargs):
+        return RunnableLambda(lambda prompt_value: self.grade(prompt_value, schema))
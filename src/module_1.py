@@ -1,24 +1,10 @@
 import streamlit as st
-import os
-import pandas as pd
 
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 
-# take environment variables from .env
-from dotenv import load_dotenv
-load_dotenv()
+from src.data_store import load_dataset
+from src.llm_gateway import get_llm
 
-# load the GROQ API Key
-groq_api_key = os.getenv("GROQ_API_KEY")
-groq_model_name = "llama3-70b-8192"
-llm = ChatGroq(model=groq_model_name, groq_api_key=groq_api_key)
-
-CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))          # current directory
-TRUNK_DIR = os.path.abspath(os.path.join(CURRENT_DIR, '..'))      # Move up one level to reach the trunk
-DATA_FILE = os.path.join(TRUNK_DIR, 'data', 'josaa_seats_aggregated.csv')
-df = pd.read_csv(DATA_FILE)
-clusters = df['Branch Cluster'].unique()
 
 PROMPT = """
 
@@ -56,12 +42,11 @@ prompt = ChatPromptTemplate.from_messages([
     ("human", PROMPT),
 ])
 
-chain = prompt | llm
-
 def get_top_subgroups(responses: dict):
     """
     responses keys: q1, q2, q3, q4, q5, q6, q7_creative, q7_analytic, q8
     """
+    chain = prompt | get_llm()
     result = chain.invoke(responses)
     return result.content
 
@@ -194,7 +179,7 @@ def run():
             "q8": ", ".join(q8)
         }
 
-        user_answers["clusters"]= clusters
+        user_answers["clusters"]= list(load_dataset('seats')['Branch Cluster'].unique())
         ai_recom = get_top_subgroups(user_answers)
 
         st.subheader("Recommended Branch Clusters:")
@@ -2,18 +2,16 @@
 
 import streamlit as st
 from langchain.schema import SystemMessage, HumanMessage
-from langchain_groq import ChatGroq
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
 import os
+import re
+import threading
+import time
 
-# take environment variables from .env
-from dotenv import load_dotenv
-load_dotenv()
-
-# load the GROQ API Key
-groq_api_key = os.getenv("GROQ_API_KEY")
-
-groq_model_name = "llama3-70b-8192"
-llm = ChatGroq(model=groq_model_name, groq_api_key=groq_api_key)
+from src.llm_gateway import chat_messages, get_llm
+from src.response_cache import ResponseCache
+from src.streaming import timed_stream
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))          # current directory
 TRUNK_DIR = os.path.abspath(os.path.join(CURRENT_DIR, '..'))      # Move up one level to reach the trunk
@@ -26,6 +24,119 @@ with open(BRANCH_INFO_PROMPT, "r") as file:
 with open(CAREER_GOAL_PROMPT, "r") as file:
     career_goal_prompt = file.read()
 
+# Specializations offered in JoSAA participating institutes (the cards at the bottom of the page)
+specializations = {
+    "Aeronautical / Aerospace Engineering": "Specializes in aircraft and spacecraft design, aerodynamics, propulsion, and avionics. Prepares you for roles in the aviation industry, defense R&D, and space missions.",
+    "Agricultural and Food Engineering": "Applies engineering principles to agriculture—crop processing, food preservation, irrigation systems, and farm machinery. Focus on improving food security and agribusiness.",
+    "Architecture": "Blends art and engineering to design functional, aesthetic buildings and spaces. Involves structural basics, building materials, and urban design principles.",
+    "Artificial Intelligence and Data Science": "Covers machine learning, deep learning, data mining, and big-data systems. Prepares you for AI research, data analytics, and building intelligent applications.",
+    "Bio Tech and Engineering": "Merges biology with engineering to develop bioprocesses, genetic engineering, and medical devices. Applications include biopharmaceuticals, biofuels, and tissue engineering.",
+    "Chemical Engineering": "Combines chemistry, physics, and biology to design processes for large-scale chemical production—petrochemicals, pharmaceuticals, plastics, and food processing.",
+    "Chemistry": "A pure science program covering organic, inorganic, physical, and analytical chemistry. Opens paths in research labs, pharmaceuticals, materials science, and chemical analysis.",
+    "Civil Engineering": "Studies the design, construction, and maintenance of infrastructure—roads, bridges, dams, and buildings. Covers structural analysis, geotechnical engineering, transportation systems, and urban planning.",
+    "Computer Science and Engineering (CSE)": "Focuses on algorithms, data structures, software design, operating systems, databases, and computer networks. Prepares you for roles in software development, systems architecture, and high-performance computing.",
+    "Economics": "Applies quantitative and qualitative methods to study markets, resource allocation, and policy. Valuable for roles in finance, consulting, and data-driven policy analysis.",
+    "Electrical and Electronics Engineering (EEE)": "Encompasses power generation/distribution, electrical machines, control systems, and basic electronics. Trains you in circuit design, renewable energy systems, and industrial automation.",
+    "Electronics and Communication Engineering (ECE)": "Covers analog/digital electronics, signal processing, telecommunications, and embedded systems. Equips you to work on everything from mobile networks to IoT hardware.",
+    "Energy and Environment": "Integrates renewable energy technologies (solar, wind, biofuels) with environmental engineering (wastewater treatment, pollution control). Addresses sustainability and resource management.",
+    "Engineering Design": "Focuses on product development, CAD/CAM, and human-centered design. Teaches you to take ideas from concept through prototyping to manufacturing.",
+    "Geology": "Studies earth materials, rock formations, and geological processes—volcanism, tectonics, and sedimentology. Essential for exploration, environmental assessment, and hazard analysis.",
+    "Industrial Engineering": "Optimizes complex systems and processes in manufacturing, logistics, and service industries. Uses operations research, quality control, and human-factors engineering to boost productivity.",
+    "Information Technology": "Emphasizes network management, cybersecurity, database administration, and web/mobile application development. Preps you for managing and securing enterprise IT systems.",
+    "Instrumentation Engineering": "Deals with sensors, transducers, and control instrumentation for industrial processes. Combines electronics, measurement, and automation for precise system monitoring.",
+    "Mathematics": "Focuses on pure and applied math—calculus, algebra, statistics, and numerical methods. Foundation for careers in cryptography, modeling, finance, and academic research.",
+    "Mechanical Engineering": "Deals with the design, analysis, and manufacturing of mechanical systems—engines, machines, HVAC, and robotics. Blends theory (thermodynamics, fluid mechanics) with hands-on prototyping.",
+    "Metallurgical and Materials Engineering": "Explores the properties, processing, and performance of metals, ceramics, polymers, and composites. Applications range from aerospace alloys to biomedical implants and nanomaterials.",
+    "Mining and Earth Sciences": "Covers mining techniques, mineral processing, and geological surveying. Trains you to locate, extract, and manage earth resources safely and sustainably.",
+    "Physics": "A foundational science program studying mechanics, electromagnetism, quantum theory, and optics. Ideal for careers in research, teaching, instrumentation, and R&D labs.",
+    "Planning": "Covers urban and regional planning, transportation systems, and infrastructure policy. Trains you to design sustainable cities and manage public-sector development projects.",
+    "Textile Technology": "Studies fibers, yarns, fabrics, and textile processing. Includes weaving/knitting, dyeing/finishing, and sustainable textile innovations—key to the Erode textile cluster."
+}
+
+# Branch Explorer section key -> heading
+BRANCH_SECTIONS = {
+    "introduction": "Introduction",
+    "high_school": "High School Concepts",
+    "college_subjects": "College Subjects",
+    "career_roles": "Future Career Roles",
+}
+
+# Lead-ins people type before a branch name, as in the page's own example "Tell me about Mechanical Engineering"
+BRANCH_LEAD_IN = re.compile(r"^(?:tell me about|what is|info on|information on|about)\s+")
+
+def branch_key(text):
+    """Case-, punctuation- and whitespace-insensitive form of a typed branch name."""
+    return BRANCH_LEAD_IN.sub("", " ".join(re.sub(r"[^\w]+", " ", text.casefold()).split()))
+
+# branch_key() of every way to name a listed specialization -> its name: the full name, the name without the
+# abbreviation ("Computer Science and Engineering") and the abbreviation alone ("CSE")
+BRANCH_ALIASES = {}
+for _name in specializations:
+    BRANCH_ALIASES[branch_key(_name)] = _name
+    _abbreviated = re.fullmatch(r"(.+?)\s*\((\w+)\)", _name)
+    if _abbreviated:
+        BRANCH_ALIASES[branch_key(_abbreviated.group(1))] = _name
+        BRANCH_ALIASES[branch_key(_abbreviated.group(2))] = _name
+
+def canonical_branch(branch_name):
+    """The listed specialization a typed name refers to, or the typed name itself if it matches none."""
+    return BRANCH_ALIASES.get(branch_key(branch_name), " ".join(branch_name.split()))
+
+# Persistent cache of the Branch Explorer answers (see src/response_cache.py). Only the four sections of a branch
+# are cached: they repeat across users and are pre-generated by warm_up(). The Branch Recommender's free-text
+# career goals are personal and rarely repeat, so they always go to the LLM and are never stored.
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB", os.path.join(TRUNK_DIR, 'llm_cache.sqlite'))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(30 * 24 * 60 * 60)))
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", "64"))
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def response_cache():
+    """The process-wide ResponseCache, opened on first use."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(RESPONSE_CACHE_DB, ttl=RESPONSE_CACHE_TTL,
+                                                max_bytes=int(RESPONSE_CACHE_MAX_MB * 1024 * 1024))
+    return _response_cache
+
+def branch_info_input(section, branch_name):
+    """The user message for one section of a branch, with the branch as the user typed it."""
+    return f"Provide {section} information for {' '.join(branch_name.split())}."
+
+def branch_info_key(section, branch_name):
+    """
+    The cache key input for one section of a branch: branch_info_input() of its canonical_branch(), so every
+    way of naming a listed specialization shares one entry, and the page and warm_up() share keys.
+    """
+    return branch_info_input(section, canonical_branch(branch_name))
+
+def warm_up(workers=8):
+    """
+    Generate and cache every known specialization x section answer that is not cached yet, `workers` at a time.
+    Returns (generated, already cached, failed).
+    """
+    cache = response_cache()
+    llm = get_llm()
+    # Listed names are already canonical, so each input is its own key input
+    pending = [branch_info_key(section, branch) for branch in specializations for section in BRANCH_SECTIONS]
+    missing = [user_input for user_input in pending
+               if not cache.contains(cache.key(llm, branch_info_prompt, user_input))]
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(cache.generate, llm, branch_info_prompt, user_input): user_input
+                   for user_input in missing}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                print(f"cached: {futures[future]}")
+            except Exception as e:
+                failed += 1
+                print(f"failed: {futures[future]} ({e})")
+    return len(missing) - failed, len(pending) - len(missing), failed
+
 def run(): 
 
     st.markdown("""
@@ -90,23 +201,19 @@ def run():
             st.session_state.show_sections = False  # Reset section visibility
 
             # Buttons for different sections
-            if st.button("Introduction"):
-                st.session_state.show_sections = "introduction"
-            if st.button("High School Concepts"):
-                st.session_state.show_sections = "high_school"
-            if st.button("College Subjects"):
-                st.session_state.show_sections = "college_subjects"
-            if st.button("Future Career Roles"):
-                st.session_state.show_sections = "career_roles"
-
-            # Fetch information from LLM only for selected sections
+            for section, heading in BRANCH_SECTIONS.items():
+                if st.button(heading):
+                    st.session_state.show_sections = section
+
+            # Fetch information only for selected sections (from the response cache when it has been asked before)
             if "show_sections" in st.session_state and st.session_state.show_sections:
                 system_prompt = branch_info_prompt
-                user_input = f"Provide {st.session_state.show_sections} information for {st.session_state.branch_name}."
-                response = llm.invoke([{"role": "system", "content": system_prompt}, {"role": "user", "content": user_input}])
+                section, branch_name = st.session_state.show_sections, st.session_state.branch_name
+                response = response_cache().stream(get_llm(), system_prompt, branch_info_input(section, branch_name),
+                                                   key_input=branch_info_key(section, branch_name))
                 
                 st.write(f"### {st.session_state.show_sections.replace('_', ' ').title()}:")
-                st.write(response.content)
+                st.write_stream(timed_stream("branch_info", response))
 
     elif st.session_state.mode == "career_goal":
         st.subheader("Branch Recommender")
@@ -114,37 +221,10 @@ def run():
 
         if career_input:
             system_prompt = career_goal_prompt
-            response = llm.invoke([{"role": "system", "content": system_prompt}, {"role": "user", "content": career_input}])
+            response = get_llm().stream(chat_messages(system_prompt, career_input))
             st.write("### AI Recommendation:")
-            st.write(response.content)
-
-    specializations = {
-        "Aeronautical / Aerospace Engineering": "Specializes in aircraft and spacecraft design, aerodynamics, propulsion, and avionics. Prepares you for roles in the aviation industry, defense R&D, and space missions.",
-        "Agricultural and Food Engineering": "Applies engineering principles to agriculture—crop processing, food preservation, irrigation systems, and farm machinery. Focus on improving food security and agribusiness.",
-        "Architecture": "Blends art and engineering to design functional, aesthetic buildings and spaces. Involves structural basics, building materials, and urban design principles.",
-        "Artificial Intelligence and Data Science": "Covers machine learning, deep learning, data mining, and big-data systems. Prepares you for AI research, data analytics, and building intelligent applications.",
-        "Bio Tech and Engineering": "Merges biology with engineering to develop bioprocesses, genetic engineering, and medical devices. Applications include biopharmaceuticals, biofuels, and tissue engineering.",
-        "Chemical Engineering": "Combines chemistry, physics, and biology to design processes for large-scale chemical production—petrochemicals, pharmaceuticals, plastics, and food processing.",
-        "Chemistry": "A pure science program covering organic, inorganic, physical, and analytical chemistry. Opens paths in research labs, pharmaceuticals, materials science, and chemical analysis.",
-        "Civil Engineering": "Studies the design, construction, and maintenance of infrastructure—roads, bridges, dams, and buildings. Covers structural analysis, geotechnical engineering, transportation systems, and urban planning.",
-        "Computer Science and Engineering (CSE)": "Focuses on algorithms, data structures, software design, operating systems, databases, and computer networks. Prepares you for roles in software development, systems architecture, and high-performance computing.",
-        "Economics": "Applies quantitative and qualitative methods to study markets, resource allocation, and policy. Valuable for roles in finance, consulting, and data-driven policy analysis.",
-        "Electrical and Electronics Engineering (EEE)": "Encompasses power generation/distribution, electrical machines, control systems, and basic electronics. Trains you in circuit design, renewable energy systems, and industrial automation.",
-        "Electronics and Communication Engineering (ECE)": "Covers analog/digital electronics, signal processing, telecommunications, and embedded systems. Equips you to work on everything from mobile networks to IoT hardware.",
-        "Energy and Environment": "Integrates renewable energy technologies (solar, wind, biofuels) with environmental engineering (wastewater treatment, pollution control). Addresses sustainability and resource management.",
-        "Engineering Design": "Focuses on product development, CAD/CAM, and human-centered design. Teaches you to take ideas from concept through prototyping to manufacturing.",
-        "Geology": "Studies earth materials, rock formations, and geological processes—volcanism, tectonics, and sedimentology. Essential for exploration, environmental assessment, and hazard analysis.",
-        "Industrial Engineering": "Optimizes complex systems and processes in manufacturing, logistics, and service industries. Uses operations research, quality control, and human-factors engineering to boost productivity.",
-        "Information Technology": "Emphasizes network management, cybersecurity, database administration, and web/mobile application development. Preps you for managing and securing enterprise IT systems.",
-        "Instrumentation Engineering": "Deals with sensors, transducers, and control instrumentation for industrial processes. Combines electronics, measurement, and automation for precise system monitoring.",
-        "Mathematics": "Focuses on pure and applied math—calculus, algebra, statistics, and numerical methods. Foundation for careers in cryptography, modeling, finance, and academic research.",
-        "Mechanical Engineering": "Deals with the design, analysis, and manufacturing of mechanical systems—engines, machines, HVAC, and robotics. Blends theory (thermodynamics, fluid mechanics) with hands-on prototyping.",
-        "Metallurgical and Materials Engineering": "Explores the properties, processing, and performance of metals, ceramics, polymers, and composites. Applications range from aerospace alloys to biomedical implants and nanomaterials.",
-        "Mining and Earth Sciences": "Covers mining techniques, mineral processing, and geological surveying. Trains you to locate, extract, and manage earth resources safely and sustainably.",
-        "Physics": "A foundational science program studying mechanics, electromagnetism, quantum theory, and optics. Ideal for careers in research, teaching, instrumentation, and R&D labs.",
-        "Planning": "Covers urban and regional planning, transportation systems, and infrastructure policy. Trains you to design sustainable cities and manage public-sector development projects.",
-        "Textile Technology": "Studies fibers, yarns, fabrics, and textile processing. Includes weaving/knitting, dyeing/finishing, and sustainable textile innovations—key to the Erode textile cluster."
-    }
+            st.write_stream(timed_stream("career_goal", response))
+
 
     st.markdown('\n')
 
@@ -199,3 +279,15 @@ def run():
         """, unsafe_allow_html=True)
 
     st.markdown("</div>", unsafe_allow_html=True)
+
+
+if __name__ == "__main__":
+    # Pre-generate the Branch Explorer answers: python -m src.module_2 --workers 8
+    parser = argparse.ArgumentParser(description="Cache the Branch Explorer answers for every known specialization.")
+    parser.add_argument("--workers", type=int, default=8, help="LLM calls in flight")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generated, cached, failed = warm_up(args.workers)
+    print(f"{generated} generated, {cached} already cached, {failed} failed in {time.perf_counter() - start:.1f}s")
+    print(response_cache().stats())
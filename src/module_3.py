@@ -1,74 +1,134 @@
 # APP TO GET INFO FROM josaa-viz-2.0.py FILE AND INTO THE app_0.py
 
 import streamlit as st
-import os
-import pandas as pd
-import numpy as np
 import folium
-from folium.plugins import MarkerCluster
-from streamlit_folium import folium_static
-
-CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))          # current directory
-TRUNK_DIR = os.path.abspath(os.path.join(CURRENT_DIR, '..'))      # Move up one level to reach the trunk
-DATA_FILE = os.path.join(TRUNK_DIR, 'data', 'final_op_cl_seat_info_consolidated_2024_op_cl_with_marks_splitted_coord.csv')
-df = pd.read_csv(DATA_FILE)
+import html
+import pandas as pd
+from folium.plugins import FastMarkerCluster
+from functools import lru_cache
+
+from src.cutoff_query import (FilterSpec, RESULT_COLUMNS, SORT_COLUMNS, TABLE_COLUMNS, TREND_EXAMS, closing_rank_trend,
+                              cutoff_index, cutoff_statistics, cutoff_table, institutes_of, match, nearby_institutes,
+                              option_hierarchy, sort_rows, summarise, take)
+from src.data_store import cutoff_rounds, derived
+
+def closing_rank_hint(stats, column, partition=None):
+    median, high = stats.quantile(column, 0.5, partition), stats.quantile(column, 0.9, partition)
+    if median != median:     # NaN: no closing ranks in this partition
+        return None
+    scope = " / ".join(partition) if partition else "all seats"
+    return f"Closing ranks for {scope}: median {int(median)}, 90th percentile {int(high)}"
+
+def filter_spec(selected_institutes, selected_institute_category, selected_degrees, selected_clusters, selected_branch,
+                selected_quotas, selected_seat_types, selected_genders, **bounds):
+    return FilterSpec(institutes=selected_institutes, college_categories=selected_institute_category,
+                      degrees=selected_degrees, branch_clusters=selected_clusters, branches=[selected_branch],
+                      quotas=selected_quotas, seat_types=selected_seat_types, genders=selected_genders, **bounds)
 
 def filter_data(selected_institutes, selected_institute_category, selected_degrees, selected_clusters, selected_branch, 
                 selected_quotas, selected_seat_types, selected_genders):
     
-    filtered_df = df.copy()
-    
-    if 'All' not in selected_institutes:
-        filtered_df = filtered_df[filtered_df['Institute'].isin(selected_institutes)]
-
-    if 'All' not in selected_institute_category:
-        filtered_df = filtered_df[filtered_df['College Category'].isin(selected_institute_category)]
-
-    if 'All' not in selected_degrees:
-        filtered_df = filtered_df[filtered_df['Degree'].isin(selected_degrees)]
-    
-    if 'All' not in selected_clusters:
-        filtered_df = filtered_df[filtered_df['Branch Cluster'].isin(selected_clusters)]
-    
-    if selected_branch and selected_branch != 'All':
-        filtered_df = filtered_df[filtered_df['Branch Name'] == selected_branch]
-
-    if 'All' not in selected_quotas:
-        filtered_df = filtered_df[filtered_df['Quota'].isin(selected_quotas)]
-
-    if 'All' not in selected_seat_types:
-        filtered_df = filtered_df[filtered_df['Seat Type'].isin(selected_seat_types)]
-
-    if 'All' not in selected_genders:
-        filtered_df = filtered_df[filtered_df['Gender'].isin(selected_genders)]
+    spec = filter_spec(selected_institutes, selected_institute_category, selected_degrees, selected_clusters,
+                       selected_branch, selected_quotas, selected_seat_types, selected_genders)
     
-    return filtered_df
+    return cutoff_table().iloc[cutoff_index().filter_rows(spec.selections())]
+
+# Marker with the (HTML-escaped) institute name as popup and tooltip; row = [lat, lon, name]
+MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup('<b>' + row[2] + '</b><br>');
+    marker.bindTooltip(row[2]);
+    return marker;
+}"""
+
+MAP_CACHE_SIZE = 64
+HOME_LOCATION = (11.1271, 78.6569)    # default home for the distance filter (the map's default centre)
+
+def institute_locations():
+    """Institute -> (Latitude, Longitude), one row per institute with known coordinates."""
+    return derived('cutoffs', 'institute_locations',
+                   lambda df: df[['Institute', 'Latitude', 'Longitude']].dropna().drop_duplicates('Institute')
+                                .set_index('Institute'))
 
 def generate_map(filtered_df):
     m = folium.Map(location=[11.1271, 78.6569], zoom_start=7, width='100%', height=800)
-    marker_cluster = MarkerCluster().add_to(m)
-    
-    for _, row in filtered_df.iterrows():
-        folium.Marker(
-            location=[row["Latitude"], row["Longitude"]],
-            popup=f"""
-            <b>{row['Institute']}</b><br>
-            """,
-            tooltip=row["Institute"]
-        ).add_to(marker_cluster)
-    
-    return m
 
-def generate_table(filtered_df):
-    
-    filtered_df = filtered_df.fillna('-')
+    # One clustered layer built from the coordinate arrays, instead of a folium.Marker object per row
+    located = filtered_df.dropna(subset=['Latitude', 'Longitude'])
+    names = [html.escape(str(name)) for name in located['Institute']]
+    data = list(zip(located['Latitude'].tolist(), located['Longitude'].tolist(), names))
+    FastMarkerCluster(data, callback=MARKER_CALLBACK).add_to(m)
 
-    features_to_add = ['Institute', 'College Category', 'Program Code', 'Branch Cluster', 'Degree',
-                        'Branch Name', 'Degree Duration', 'Seat Capacity (w.r.t. Quota)', 'Aggregated Seats',
-                        'Quota', 'Seat Type', 'Gender', 'Rank Range (Mains)', 'Score Range (Mains)', 
-                        'Rank Range (Advanced)', 'Score Range (Advanced)', 'View Details']
+    return m
 
-    return filtered_df[features_to_add].reset_index(drop=True)
+@lru_cache(maxsize=MAP_CACHE_SIZE)
+def map_html(institutes, home=None):
+    """Rendered map HTML for a sorted tuple of institutes; repeated filter results skip rendering entirely."""
+    locations = institute_locations()
+    located = locations.loc[locations.index.intersection(list(institutes))].reset_index()
+    m = generate_map(located)
+    if home is not None:
+        folium.Marker(list(home), tooltip="Home", icon=folium.Icon(color='red', icon='home')).add_to(m)
+    return folium.Figure().add_child(m).render()
+
+TABLE_PAGE_SIZES = [25, 50, 100, 250]
+
+def generate_table(rows, margin, columns=RESULT_COLUMNS, page=1, page_size=TABLE_PAGE_SIZES[1]):
+    """
+    One page of the results table: only the rows and columns shown are taken from the cutoff table.
+    Numeric columns stay numeric; missing values are left for st.dataframe to render.
+    """
+    start = (page - 1) * page_size
+    return take(rows[start:start + page_size], margin[start:start + page_size], columns)
+
+def show_table(rows, margin):
+    summary = summarise(rows)
+    st.markdown(f"**{summary['programs']}** programs across **{summary['institutes']}** institutes "
+                f"and **{summary['branches']}** branches match your filters.")
+    if not len(rows):
+        return
+
+    columns = st.multiselect("Columns", options=TABLE_COLUMNS, default=RESULT_COLUMNS)
+    sort_col, order_col, size_col = st.columns([2, 1, 1])
+    sort_by = sort_col.selectbox("Sort by", options=SORT_COLUMNS)
+    descending = order_col.selectbox("Order", options=["Descending", "Ascending"]) == "Descending"
+    page_size = size_col.selectbox("Rows per page", options=TABLE_PAGE_SIZES, index=1)
+
+    num_pages = max(1, -(-len(rows) // page_size))
+    page = st.number_input(f"Page (of {num_pages})", min_value=1, max_value=num_pages, value=1, step=1)
+
+    # The column the table is sorted by is always shown, so the order can be read off the table
+    columns = columns or RESULT_COLUMNS
+    if sort_by not in columns:
+        columns = columns + [sort_by]
+
+    rows, margin = sort_rows(rows, margin, sort_by, descending)
+    st.dataframe(generate_table(rows, margin, columns, page, page_size),
+                 column_config={"Safety Margin": st.column_config.NumberColumn(format="percent"),
+                                "View Details": st.column_config.LinkColumn(),
+                                **{column: st.column_config.NumberColumn(format="%d")
+                                   for column in TABLE_COLUMNS if ' Rank (' in column}},
+                 hide_index=True)
+
+    start = (page - 1) * page_size
+    show_trend(rows[start:start + page_size])
+
+def show_trend(page_rows):
+    """Closing-rank trend across years and rounds for one program of the current page."""
+    st.markdown("**Closing-Rank Trend:**")
+    if len(cutoff_rounds.partitions()) < 2:
+        st.caption("Add earlier years or rounds as data/cutoffs/<year>/round_<n>.csv to see closing-rank trends.")
+        return
+    if len(page_rows) == 0:
+        return
+
+    programs = take(page_rows, None, ['Institute', 'Branch Name', 'Quota', 'Seat Type', 'Gender'])
+    labels = [" | ".join(str(value) for value in program) for program in programs.itertuples(index=False)]
+    position = st.selectbox("Program", options=range(len(labels)), format_func=lambda i: labels[i])
+    trend = pd.DataFrame({exam: closing_rank_trend(page_rows[position:position + 1], exam).iloc[0]
+                          for exam in TREND_EXAMS})
+    st.line_chart(trend.dropna(how='all', axis=1))
 
 def run():
 
@@ -90,41 +150,45 @@ def run():
 
     # Filters
 
-    institute_options = ['All'] + sorted(list(df['Institute'].unique()))
+    options = option_hierarchy()
+
+    institute_options = ['All'] + options.options('Institute')
     institutes = st.multiselect("Select Institute", options=institute_options, default=['All'])
 
-    institute_category_options = ['All'] + sorted(list(df['College Category'].unique()))
+    institute_category_options = ['All'] + options.options('College Category')
     institute_category = st.multiselect("Select Institute Category", options=institute_category_options, default=['All'])
 
-    degree_options = ['All'] + sorted(list(df['Degree'].unique()))
+    degree_options = ['All'] + options.options('Degree')
     degrees = st.multiselect("Select Degree", options=degree_options, default=['All'])
 
-    # cluster_options = ['All'] + sorted(list(df['Branch Cluster'].unique()))
-    cluster_options = ['All'] + sorted(list(df[df['Degree'].isin(degrees if 'All' not in degrees else df['Degree'].unique())]['Branch Cluster'].unique()))
+    # Clusters offered under the selected Degrees
+    cluster_options = ['All'] + options.options('Branch Cluster', {'Degree': degrees})
     clusters = st.multiselect("Select Branch Clusters", options=cluster_options, default=['All'])
 
     # Filter Branches based on selected Branch Cluster
-    branches_under_selected_clusters = ['All'] + sorted(list(df[(df['Branch Cluster'].isin(clusters if 'All' not in clusters else df['Branch Cluster'].unique())) & (df['Degree'].isin(degrees if 'All' not in degrees else df['Degree'].unique()))]['Branch Name'].unique()))
+    branches_under_selected_clusters = ['All'] + options.options('Branch Name', {'Degree': degrees, 'Branch Cluster': clusters})
     selected_branch = st.selectbox("Select Branch", options=branches_under_selected_clusters, index=0)
 
-    quota_options = ['All'] + sorted(list(df['Quota'].unique()))
+    quota_options = ['All'] + options.options('Quota')
     quotas = st.multiselect("Select Quota", options=quota_options, default=['All'])
 
-    seat_type_options = ['All'] + sorted(list(df['Seat Type'].unique()))
+    seat_type_options = ['All'] + options.options('Seat Type')
     seat_types = st.multiselect("Select Seat Type", options=seat_type_options, default=['All'])
 
-    gender_options = ['All'] + sorted(list(df['Gender'].unique()))
+    gender_options = ['All'] + options.options('Gender')
     genders = st.multiselect("Select Gender", options=gender_options, default=['All'])
 
-    # Convert columns to float, replacing hyphens with NaN
-    df.replace('-', np.nan, inplace=True)
+    # Define sliders based on available values (precomputed, no scan of the table)
+    stats = cutoff_statistics()
+    min_rank_mains, max_rank_mains = int(stats.min('Opening Rank (Mains)')), int(stats.max('Closing Rank (Mains)'))
+    min_score_mains, max_score_mains = int(stats.min('Opening Marks (Mains)')), int(stats.max('Closing Marks (Mains)'))
 
-    # Define sliders based on available values
-    min_rank_mains, max_rank_mains = int(df['Opening Rank (Mains)'].min()), int(df['Closing Rank (Mains)'].max())
-    min_score_mains, max_score_mains = int(df['Opening Marks (Mains)'].min()), int(df['Closing Marks (Mains)'].max())
+    min_rank_adv, max_rank_adv = int(stats.min('Opening Rank (Advanced)')), int(stats.max('Closing Rank (Advanced)'))
+    min_score_adv, max_score_adv = int(stats.min('Opening Marks (Advanced)')), int(stats.max('Closing Marks (Advanced)'))
 
-    min_rank_adv, max_rank_adv = int(df['Opening Rank (Advanced)'].min()), int(df['Closing Rank (Advanced)'].max())
-    min_score_adv, max_score_adv = int(df['Opening Marks (Advanced)'].min()), int(df['Closing Marks (Advanced)'].max())
+    # With a single Quota / Seat Type / Gender picked, hint at that partition's closing ranks
+    partition = [selected[0] for selected in (quotas, seat_types, genders) if len(selected) == 1 and 'All' not in selected]
+    partition = tuple(partition) if len(partition) == 3 and tuple(partition) in stats.partitions else None
 
     # Mains Filters
     # rank_mains = st.slider("JEE Mains Rank", min_value=min_rank_mains, max_value=max_rank_mains, value=max_rank_mains)
@@ -133,7 +197,8 @@ def run():
         min_value=min_rank_mains, 
         max_value=max_rank_mains, 
         value=min_rank_mains, 
-        step=1
+        step=1,
+        help=closing_rank_hint(stats, 'Closing Rank (Mains)', partition)
     )
     score_mains = st.number_input(
         "Enter Score (Mains):", 
@@ -150,7 +215,8 @@ def run():
         min_value=min_rank_adv, 
         max_value=max_rank_adv, 
         value=max_rank_adv, 
-        step=1
+        step=1,
+        help=closing_rank_hint(stats, 'Closing Rank (Advanced)', partition)
     )
     score_adv = st.number_input(
         "Enter Score (Advanced):", 
@@ -160,18 +226,31 @@ def run():
         step=1
     )
 
+    # Distance filter
+    location = {}
+    if st.checkbox("Only colleges near me"):
+        home_latitude = st.number_input("Home Latitude:", min_value=-90.0, max_value=90.0, value=HOME_LOCATION[0],
+                                        step=0.0001, format="%.4f")
+        home_longitude = st.number_input("Home Longitude:", min_value=-180.0, max_value=180.0, value=HOME_LOCATION[1],
+                                         step=0.0001, format="%.4f")
+        radius_km = st.number_input("Within (km, 0 for any distance):", min_value=0, max_value=5000, value=300, step=50)
+        nearest = st.number_input("Nearest institutes (0 for all):", min_value=0, max_value=500, value=0, step=1)
+        location = dict(home_latitude=home_latitude, home_longitude=home_longitude,
+                        radius_km=radius_km or None, nearest=nearest or None)
+
     # Apply filters
 
-    filtered_df_categ = filter_data(institutes, institute_category, degrees, clusters, selected_branch, quotas, seat_types, genders)
+    spec = filter_spec(institutes, institute_category, degrees, clusters, selected_branch, quotas, seat_types, genders,
+                       rank_mains=rank_mains, score_mains=score_mains, rank_adv=rank_adv, score_adv=score_adv,
+                       **location)
+    rows, margin = match(spec)
 
-    filtered_df = filtered_df_categ[
-        ((filtered_df_categ['Closing Rank (Advanced)'] >= rank_adv) | filtered_df_categ['Closing Rank (Advanced)'].isna()) &
-        ((filtered_df_categ['Closing Rank (Mains)'] >= rank_mains) | filtered_df_categ['Closing Rank (Mains)'].isna()) &
-        ((filtered_df_categ['Opening Marks (Advanced)'] <= score_adv) | filtered_df_categ['Opening Marks (Advanced)'].isna()) &
-        ((filtered_df_categ['Opening Marks (Mains)'] <= score_mains) | filtered_df_categ['Opening Marks (Mains)'].isna())
-    ]
+    nearby = nearby_institutes(spec)
+    if nearby is not None:
+        st.caption(f"{len(nearby)} institutes in range" +
+                   (f"; nearest: {nearby[0][0]} ({nearby[0][1]:.0f} km)" if nearby else ""))
 
-    unique_colleges = filtered_df[['Institute', 'Latitude', 'Longitude']].drop_duplicates()
+    unique_colleges = institutes_of(rows)
 
     st.subheader("Filtered Colleges")
 
@@ -179,10 +258,13 @@ def run():
     map_button = st.button("Map")
 
     st.markdown("**Filtered Data Table:**")
-    table_button = st.button("Table")
+    # The table stays open across reruns so its sort and page controls can be used
+    if st.button("Table"):
+        st.session_state.show_cutoff_table = True
 
     if map_button:
-        folium_static(generate_map(unique_colleges))
+        home = (spec.home_latitude, spec.home_longitude) if nearby is not None else None
+        st.iframe(map_html(unique_colleges, home), height=510, width=700)
 
-    if table_button:
-        st.dataframe(generate_table(filtered_df))
\ No newline at end of file
+    if st.session_state.get("show_cutoff_table"):
+        show_table(rows, margin)
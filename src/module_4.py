@@ -3,28 +3,24 @@
 import streamlit as st
 from langchain.prompts import PromptTemplate
 from langchain_core.runnables import RunnableSequence
-from langchain_groq import ChatGroq
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
 import os
-import pandas as pd
+import threading
+import time
 
-# take environment variables from .env
-from dotenv import load_dotenv
-load_dotenv()
+from src.data_store import derived
+from src.llm_gateway import RateLimiter, get_llm
+from src.option_hierarchy import ProgramIndex
+from src.profile_store import ProfileStore, content_address, prompt_version
+from src.response_cache import ResponseCache, model_identity
+from src.streaming import chunk_text, timed_stream
 
-# load the GROQ API Key
-groq_api_key = os.getenv("GROQ_API_KEY")
-
-# LLM setup using Groq
-llm = ChatGroq(temperature=0, model_name="llama3-70b-8192")
-
-# Importing the dataset for college category and name, branches and more info link
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))          # current directory
 TRUNK_DIR = os.path.abspath(os.path.join(CURRENT_DIR, '..'))      # Move up one level to reach the trunk
-DATA_FILE = os.path.join(TRUNK_DIR, 'data', 'josaa_branchwise_info_viz.csv')
 INFO_BOT_PROMPT = os.path.join(TRUNK_DIR, 'prompts', 'info_bot_prompt.txt')
 COMPARISON_BOT_PROMPT = os.path.join(TRUNK_DIR, 'prompts', 'comparison_bot_prompt.txt')
-
-df = pd.read_csv(DATA_FILE)
+COMPARISON_SYNTHESIS_PROMPT = os.path.join(TRUNK_DIR, 'prompts', 'comparison_synthesis_prompt.txt')
 
 with open(INFO_BOT_PROMPT, "r") as file:
     info_bot_prompt = file.read()
@@ -32,8 +28,152 @@ with open(INFO_BOT_PROMPT, "r") as file:
 with open(COMPARISON_BOT_PROMPT, "r") as file:
     comparison_bot_prompt = file.read()
 
+with open(COMPARISON_SYNTHESIS_PROMPT, "r") as file:
+    comparison_synthesis_prompt = file.read()
+
+# "full": one call researching both sides; "two_stage": the two Info Bot profiles (stored or generated once)
+# and a short call that only compares them
+COMPARISON_MODES = {
+    "full": "Full comparison",
+    "two_stage": "Quick comparison from program profiles",
+}
+
+# Info Bot profiles generated ahead of time (python -m src.module_4), served before falling back to a live call
+INFO_PROFILE_DIR = os.getenv("INFO_PROFILE_DIR", os.path.join(TRUNK_DIR, 'data', 'profiles'))
+profile_store = ProfileStore(INFO_PROFILE_DIR)
+
+# Comparisons are made on demand for any pair of programs, so unlike the profiles they are kept in a bounded cache:
+# entries expire after COMPARISON_CACHE_TTL seconds and the least recently used go once it exceeds its size budget
+COMPARISON_CACHE_DB = os.getenv("COMPARISON_CACHE_DB", os.path.join(TRUNK_DIR, 'comparison_cache.sqlite'))
+COMPARISON_CACHE_TTL = float(os.getenv("COMPARISON_CACHE_TTL", str(7 * 24 * 60 * 60)))
+COMPARISON_CACHE_MAX_MB = float(os.getenv("COMPARISON_CACHE_MAX_MB", "32"))
+
+_comparison_cache = None
+_comparison_cache_lock = threading.Lock()
+
+def comparison_cache():
+    """The process-wide comparison ResponseCache, opened on first use."""
+    global _comparison_cache
+    if _comparison_cache is None:
+        with _comparison_cache_lock:
+            if _comparison_cache is None:
+                _comparison_cache = ResponseCache(COMPARISON_CACHE_DB, ttl=COMPARISON_CACHE_TTL,
+                                                  max_bytes=int(COMPARISON_CACHE_MAX_MB * 1024 * 1024))
+    return _comparison_cache
+
+def program_index():
+    """Category -> colleges, college -> branches and (college, branch) -> row, built once and shared by all sessions."""
+    return derived('branchwise', 'program_index', ProgramIndex)
+
+def details_of(college, branch):
+    """The 'View Details' link of a (college, branch) pair."""
+    return program_index().record(college, branch)['View Details']
+
+def info_programs():
+    """(College Name, Branch Name, View Details) for every pair."""
+    return [(college, branch, record['View Details']) for (college, branch), record in program_index().records.items()]
+
+def info_inputs(college, branch, detailed_info):
+    return {"college": college, "branch": branch, "josaa_info": detailed_info}
+
+def profile_key(llm, college, branch, detailed_info):
+    """Store address of an Info Bot profile: model, prompt version and the row's values."""
+    return content_address(model_identity(llm), prompt_version(info_bot_prompt), college, branch, detailed_info)
+
+def info_chain(llm):
+    return PromptTemplate.from_template(info_bot_prompt) | llm
+
+def stream_profile(college, branch, detailed_info):
+    """Yield the Info Bot profile: the stored one if present, otherwise streamed live and then stored."""
+    llm = get_llm(temperature=0)
+    key = profile_key(llm, college, branch, detailed_info)
+    stored = profile_store.get(key)
+    if stored is not None:
+        yield stored
+        return
+    parts = []
+    for text in chunk_text(info_chain(llm).stream(info_inputs(college, branch, detailed_info))):
+        parts.append(text)
+        yield text
+    profile_store.put(key, "".join(parts), info_inputs(college, branch, detailed_info))
+
+def generate_profile(college, branch, detailed_info, rate_limiter=None):
+    """The Info Bot profile text, from the store or one (non-streaming) LLM call whose result is stored."""
+    llm = get_llm(temperature=0)
+    key = profile_key(llm, college, branch, detailed_info)
+    profile = profile_store.get(key)
+    if profile is None:
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        profile = info_chain(llm).invoke(info_inputs(college, branch, detailed_info)).content
+        profile_store.put(key, profile, info_inputs(college, branch, detailed_info))
+    return profile
+
+def generate_profiles(workers=4, requests_per_minute=30, limit=None):
+    """
+    Generate the missing Info Bot profiles for every college-branch pair, `workers` calls in flight and at most
+    `requests_per_minute` started per minute. Each profile is stored as soon as it is done, so a failed or
+    interrupted run is resumed by running it again. Returns (generated, already stored, failed pairs).
+    """
+    llm = get_llm(temperature=0)
+    programs = info_programs()
+    pending = [program for program in programs if profile_key(llm, *program) not in profile_store]
+    stored = len(programs) - len(pending)
+    pending = pending[:limit]
+    rate_limiter = RateLimiter(requests_per_minute)
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(generate_profile, *program, rate_limiter=rate_limiter): program
+                   for program in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            college, branch, _ = futures[future]
+            try:
+                future.result()
+                print(f"[{done}/{len(pending)}] {college} - {branch}")
+            except Exception as e:
+                failed.append((college, branch))
+                print(f"[{done}/{len(pending)}] FAILED {college} - {branch}: {e}")
+    return len(pending) - len(failed), stored, failed
+
+def comparison_inputs(side1, side2):
+    (college1, branch1, info1), (college2, branch2, info2) = side1, side2
+    return {"college1": college1, "branch1": branch1, "josaa_info1": info1,
+            "college2": college2, "branch2": branch2, "josaa_info2": info2}
+
+def stream_comparison(side1, side2, mode="full"):
+    """
+    Yield the comparison of two (college, branch, View Details) sides. The sides are put in a fixed order first,
+    so "A vs B" and "B vs A" are the same stored comparison. A two-stage comparison is addressed by its profiles'
+    keys as well, so it is regenerated whenever either profile is.
+    """
+    llm = get_llm(temperature=0)
+    side1, side2 = sorted([tuple(side1), tuple(side2)])
+    prompt = comparison_synthesis_prompt if mode == "two_stage" else comparison_bot_prompt
+    parts = [mode, model_identity(llm), prompt_version(prompt), side1, side2]
+    if mode == "two_stage":
+        parts += [profile_key(llm, *side1), profile_key(llm, *side2)]
+    key = content_address(*parts)
+    cache = comparison_cache()
+    stored = cache.get(key)
+    if stored is not None:
+        yield stored
+        return
+
+    inputs = comparison_inputs(side1, side2)
+    if mode == "two_stage":
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            inputs["profile1"], inputs["profile2"] = executor.map(lambda side: generate_profile(*side), (side1, side2))
+    response = []
+    for text in chunk_text((PromptTemplate.from_template(prompt) | llm).stream(inputs)):
+        response.append(text)
+        yield text
+    cache.put(key, "".join(response))
+
 def run():
 
+    # college category and name, branches and more info link (indexed once, shared by all sessions)
+    index = program_index()
+
     st.markdown("""
     <div style='border: 1px solid #ccc; border-radius: 10px; padding: 20px; background-color: #f9f9f9;'>
 
@@ -82,30 +222,25 @@ def run():
     if st.session_state.mode == "info_bot":
         st.subheader("College & Branch Info")
 
-        categories = ['All'] + sorted(list(df['College Category'].unique()))
+        categories = ['All'] + index.categories
         selected_category = st.selectbox("Select College Category", categories)
 
         # Filter college list based on selected category
-        if selected_category == 'All':
-            filtered_colleges = df['College Name'].unique()
-        else:
-            filtered_colleges = df[df['College Category'] == selected_category]['College Name'].unique()
+        filtered_colleges = index.colleges_in(selected_category)
 
-        college = st.selectbox("Select College", sorted(filtered_colleges), key="info_college")
+        college = st.selectbox("Select College", filtered_colleges, key="info_college")
 
         # Filter branches based on selected college
-        branches = df[df["College Name"] == college]["Branch Name"].unique()
-        branch = st.selectbox("Select Branch", sorted(branches), key="info_branch")
-        detailed_info = list(df[(df['College Name']==college) & (df['Branch Name']==branch)]['View Details'])[0]
+        branches = index.branches_of(college)
+        branch = st.selectbox("Select Branch", branches, key="info_branch")
+        detailed_info = details_of(college, branch)
 
         if st.button("Get Info"):
             # st.spinner() is a context manager in Streamlit that shows a temporary loading spinner while executing a block of code.
             with st.spinner("Fetching information..."):
-                prompt = PromptTemplate.from_template(info_bot_prompt)
-                chain = prompt | llm
-                response = chain.invoke({"college": college, "branch": branch, "josaa_info": detailed_info})
+                response = stream_profile(college, branch, detailed_info)
                 st.write("### Result")
-                st.markdown(response.content)
+                st.write_stream(timed_stream("info_bot", response))
 
     # --- COMPARISON BOT Mode ---
     elif st.session_state.mode == "comparison_bot":
@@ -117,46 +252,50 @@ def run():
         col1, col2 = st.columns(2)
         with col1:
 
-            categories1 = ['All'] + sorted(list(df['College Category'].unique()))
+            categories1 = ['All'] + index.categories
             selected_category1 = st.selectbox("Select College Category 1", categories1)
 
-            if selected_category1 == 'All':
-                filtered_colleges1 = df['College Name'].unique()
-            else:
-                filtered_colleges1 = df[df['College Category'] == selected_category1]['College Name'].unique()
-            college1 = st.selectbox("Select College 1", sorted(filtered_colleges1), key="c1")
+            filtered_colleges1 = index.colleges_in(selected_category1)
+            college1 = st.selectbox("Select College 1", filtered_colleges1, key="c1")
 
-            branches1 = df[df["College Name"] == college1]["Branch Name"].unique()
-            branch1 = st.selectbox("Select Branch 1", sorted(branches1), key="b1")
-            detailed_info1 = list(df[(df['College Name']==college1) & (df['Branch Name']==branch1)]['View Details'])[0]
+            branches1 = index.branches_of(college1)
+            branch1 = st.selectbox("Select Branch 1", branches1, key="b1")
+            detailed_info1 = details_of(college1, branch1)
 
         with col2:
 
-            categories2 = ['All'] + sorted(list(df['College Category'].unique()))
+            categories2 = ['All'] + index.categories
             selected_category2 = st.selectbox("Select College Category 2", categories2)
 
-            if selected_category2 == 'All':
-                filtered_colleges2 = df['College Name'].unique()
-            else:
-                filtered_colleges2 = df[df['College Category'] == selected_category2]['College Name'].unique()
-            college2 = st.selectbox("Select College 2", sorted(filtered_colleges2), key="c2")
+            filtered_colleges2 = index.colleges_in(selected_category2)
+            college2 = st.selectbox("Select College 2", filtered_colleges2, key="c2")
 
-            branches2 = df[df["College Name"] == college2]["Branch Name"].unique()
-            branch2 = st.selectbox("Select Branch 2", sorted(branches2), key="b2")
-            detailed_info2 = list(df[(df['College Name']==college2) & (df['Branch Name']==branch2)]['View Details'])[0]
+            branches2 = index.branches_of(college2)
+            branch2 = st.selectbox("Select Branch 2", branches2, key="b2")
+            detailed_info2 = details_of(college2, branch2)
+
+        comparison_mode = st.radio("Comparison type", options=list(COMPARISON_MODES), format_func=COMPARISON_MODES.get,
+                                   horizontal=True)
 
         if st.button("Compare"):
             with st.spinner("Comparing..."):
-                prompt = PromptTemplate.from_template(comparison_bot_prompt)
-                chain = prompt | llm
-                response = chain.invoke({
-                    "college1": college1,
-                    "branch1": branch1,
-                    "josaa_info1": detailed_info1,
-                    "college2": college2,
-                    "branch2": branch2,
-                    "josaa_info2": detailed_info2
-                })
+                response = stream_comparison((college1, branch1, detailed_info1), (college2, branch2, detailed_info2),
+                                             mode=comparison_mode)
                 st.write("### Comparison Result")
 
-                st.markdown(response.content)
+                st.write_stream(timed_stream("comparison_bot", response))
+
+
+if __name__ == "__main__":
+    # Pre-generate the Info Bot profiles: python -m src.module_4 --workers 4 --rpm 30
+    parser = argparse.ArgumentParser(description="Generate the Info Bot profile of every college-branch pair.")
+    parser.add_argument("--workers", type=int, default=4, help="LLM calls in flight")
+    parser.add_argument("--rpm", type=float, default=30, help="max LLM calls started per minute (0: no limit)")
+    parser.add_argument("--limit", type=int, help="generate at most this many profiles in this run")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generated, stored, failed = generate_profiles(args.workers, args.rpm, args.limit)
+    print(f"{generated} generated, {stored} already stored, {len(failed)} failed in {time.perf_counter() - start:.1f}s")
+    if failed:
+        print("re-run to retry the failed pairs")
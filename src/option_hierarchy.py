@@ -0,0 +1,81 @@
+# Cascading option lists for the filter widgets (e.g. Degree -> Branch Cluster -> Branch Name).
+# Every path through the hierarchy is collected once from the table, so the options under a selection are a dict
+# lookup (memoised per selection) instead of a filter + unique() + sorted() over the whole frame on each rerun.
+# ProgramIndex does the same for the Insight Hub's category -> college -> branch pickers and adds the row lookup.
+
+from functools import lru_cache
+
+def sorted_values(series):
+    return sorted(series.dropna().unique().tolist())
+
+
+class OptionHierarchy:
+    """
+    Sorted option lists for `levels` (outermost first) and for any `flat_columns`.
+    options(column, selections) gives the values of a level under the selected values of the levels above it.
+    """
+
+    def __init__(self, df, levels, flat_columns=()):
+        self.levels = list(levels)
+        self.flat = {column: sorted_values(df[column]) for column in self.levels + list(flat_columns)}
+        # depth -> {values of the levels above: sorted values at this depth}
+        self.children = {}
+        paths = df[self.levels].dropna().drop_duplicates()
+        for depth in range(1, len(self.levels)):
+            grouped = paths.groupby(self.levels[:depth], observed=True)[self.levels[depth]]
+            self.children[depth] = {key if isinstance(key, tuple) else (key,): sorted_values(values)
+                                    for key, values in grouped}
+        self.cached_options = lru_cache(maxsize=1024)(self.compute_options)
+
+    def options(self, column, selections=None):
+        """
+        Sorted values of `column` allowed by `selections` ({level column: selected values}) for the levels above it.
+        A level that is missing, None, 'All' or contains 'All' does not restrict the options.
+        """
+        depth = self.levels.index(column) if column in self.levels else 0
+        constraints = []
+        for level in self.levels[:depth]:
+            values = (selections or {}).get(level)
+            if isinstance(values, str):
+                values = [values]
+            constraints.append(None if values is None or 'All' in values else frozenset(values))
+        if all(constraint is None for constraint in constraints):
+            return self.flat[column]
+        return self.cached_options(depth, tuple(constraints))
+
+    def compute_options(self, depth, constraints):
+        matched = set()
+        for parents, values in self.children[depth].items():
+            if all(constraint is None or parent in constraint for parent, constraint in zip(parents, constraints)):
+                matched.update(values)
+        return sorted(matched)
+
+
+class ProgramIndex:
+    """
+    Hash lookups over a college-branch table: category -> sorted colleges, college -> sorted branches and
+    (college, branch) -> record (the first row for the pair, as a dict).
+    """
+
+    def __init__(self, df, category_column='College Category', college_column='College Name',
+                 branch_column='Branch Name'):
+        self.categories = sorted_values(df[category_column])
+        self.colleges = {None: sorted_values(df[college_column])}
+        for category, colleges in df.groupby(category_column, observed=True)[college_column]:
+            self.colleges[category] = sorted_values(colleges)
+        self.branches = {college: sorted_values(branches)
+                         for college, branches in df.groupby(college_column, observed=True)[branch_column]}
+        rows = df.dropna(subset=[college_column, branch_column]).drop_duplicates([college_column, branch_column])
+        self.records = {(record[college_column], record[branch_column]): record
+                        for record in rows.to_dict(orient='records')}
+
+    def colleges_in(self, category=None):
+        """Sorted colleges of `category` (None or 'All': every college)."""
+        return self.colleges.get(None if category == 'All' else category, [])
+
+    def branches_of(self, college):
+        return self.branches.get(college, [])
+
+    def record(self, college, branch):
+        """The row for (college, branch), or None."""
+        return self.records.get((college, branch))
@@ -0,0 +1,57 @@
+# Content-addressed store for generated college-branch profiles (Info Bot).
+# A profile is saved under the hash of everything that produced it - the model, the prompt text and the dataset
+# row - so editing the prompt, switching models or changing a row's details simply addresses a new entry, and an
+# old one is never served for inputs it was not generated from. Each profile is its own JSON file, written
+# atomically, so an interrupted bulk run keeps everything it finished and resumes from there.
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+def content_address(*parts):
+    """sha256 of the JSON encoding of `parts`."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+def prompt_version(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class ProfileStore:
+    """<directory>/<key[:2]>/<key>.json -> {"key", "inputs", "profile", "created_at"}."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        """The stored profile text for `key`, or None."""
+        try:
+            with open(self.path(key), "r", encoding="utf-8") as f:
+                return json.load(f)["profile"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def put(self, key, profile, inputs=None):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "inputs": inputs, "profile": profile, "created_at": time.time()}, f)
+        os.replace(tmp_path, path)
+
+    def keys(self):
+        if not os.path.isdir(self.directory):
+            return
+        for prefix in os.listdir(self.directory):
+            prefix_dir = os.path.join(self.directory, prefix)
+            if os.path.isdir(prefix_dir):
+                for file_name in os.listdir(prefix_dir):
+                    if file_name.endswith(".json"):
+                        yield file_name[:-len(".json")]
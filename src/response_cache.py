@@ -0,0 +1,144 @@
+# Persistent cache of LLM responses for prompts that repeat across sessions and restarts (e.g. Branch Explorer
+# sections). Entries live in a SQLite file keyed by (model, temperature, system prompt hash, normalised user input),
+# expire after a TTL, and the least recently used ones are evicted once the stored text exceeds a size budget.
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from src.llm_gateway import chat_messages
+
+WHITESPACE = re.compile(r"\s+")
+
+def normalise(text):
+    """Case- and whitespace-insensitive form of a user input."""
+    return WHITESPACE.sub(" ", text).strip().casefold()
+
+def model_identity(llm):
+    """(model name, temperature) of a chat model, as far as it exposes them."""
+    return (getattr(llm, "model_name", None) or type(llm).__name__, getattr(llm, "temperature", None))
+
+
+class ResponseCache:
+    """
+    Thread-safe SQLite response cache. Each thread gets its own connection, so one cache can be shared by
+    every Streamlit session (and by the warm-up workers).
+    """
+
+    def __init__(self, path, ttl=30 * 24 * 60 * 60, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        conn = self._conn()
+        conn.execute("""CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL,
+                        size INTEGER NOT NULL, stored_at REAL NOT NULL, last_used REAL NOT NULL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(llm, system_prompt, user_input):
+        model, temperature = model_identity(llm)
+        prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        parts = json.dumps([model, temperature, prompt_hash, normalise(user_input)])
+        return hashlib.sha256(parts.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """The stored response for `key`, or None if it is missing or expired."""
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT response, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[1] < now - self.ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            row = None
+        elif row is not None:
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        conn.commit()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if row is None else row[0]
+
+    def contains(self, key):
+        """True if `key` has an unexpired entry (without counting a lookup or refreshing it)."""
+        row = self._conn().execute("SELECT stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] >= time.time() - self.ttl
+
+    def put(self, key, response):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO responses (key, response, size, stored_at, last_used) "
+                     "VALUES (?, ?, ?, ?, ?)", (key, response, len(response.encode("utf-8")), now, now))
+        conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until the stored text fits in max_bytes."""
+        conn = self._conn()
+        conn.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            evicted = []
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        conn.commit()
+
+    def stats(self):
+        size, count = self._conn().execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": count,
+                "bytes": size,
+            }
+
+    def stream(self, llm, system_prompt, user_input, key_input=None):
+        """
+        Yield the response text for (system prompt, user input): the stored text on a hit, otherwise the LLM's
+        stream, stored once it has finished (an interrupted stream is not cached). The entry is keyed by
+        `key_input` when given (e.g. a canonical form of the input), while the LLM always gets `user_input` as typed.
+        """
+        key = self.key(llm, system_prompt, user_input if key_input is None else key_input)
+        cached = self.get(key)
+        if cached is not None:
+            yield cached
+            return
+        parts = []
+        for chunk in llm.stream(chat_messages(system_prompt, user_input)):
+            text = getattr(chunk, "content", chunk)
+            if text:
+                parts.append(text)
+                yield text
+        self.put(key, "".join(parts))
+
+    def generate(self, llm, system_prompt, user_input, key_input=None):
+        """The full response text, from the cache or one (non-streaming) LLM call; `key_input` as in stream()."""
+        key = self.key(llm, system_prompt, user_input if key_input is None else key_input)
+        cached = self.get(key)
+        if cached is None:
+            cached = llm.invoke(chat_messages(system_prompt, user_input)).content
+            self.put(key, cached)
+        return cached
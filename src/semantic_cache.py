@@ -0,0 +1,74 @@
+# Semantic answer cache for JEE Docs Chat.
+# Answers are keyed on the embedding of the standalone question, so differently worded versions of the
+# same question ("When does JEE Advanced registration open?" / "JEE Adv registration start date?")
+# are served from the cache instead of running the whole rewrite -> retrieve -> grade -> generate pipeline.
+
+from collections import OrderedDict
+
+import itertools
+import threading
+import time
+import numpy as np
+
+class SemanticCache:
+    """
+    Thread-safe LRU cache of answers keyed by question embeddings.
+
+    A lookup hits when the cosine similarity to a stored question is at least `threshold`.
+    Entries expire `ttl` seconds after they were stored and the least recently used entry is
+    evicted once `max_size` entries are held.
+    """
+
+    def __init__(self, embed_fn, threshold=0.95, max_size=512, ttl=6 * 60 * 60):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()      # key -> (unit vector, answer, stored_at)
+        self._keys = itertools.count()
+        self._lock = threading.Lock()
+
+    def embed(self, question):
+        vector = np.asarray(self.embed_fn(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, vector):
+        """Return the cached answer closest to `vector`, or None on a miss."""
+        with self._lock:
+            self._expire()
+            if self._entries:
+                keys = list(self._entries)
+                matrix = np.stack([self._entries[key][0] for key in keys])
+                similarities = matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]][1]
+            self.misses += 1
+            return None
+
+    def put(self, vector, answer):
+        with self._lock:
+            self._entries[next(self._keys)] = (vector, answer, time.monotonic())
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
+
+    def _expire(self):
+        # Entries are kept in LRU order, not insertion order, so check them all (max_size is small)
+        cutoff = time.monotonic() - self.ttl
+        for key in [key for key, (_, _, stored_at) in self._entries.items() if stored_at < cutoff]:
+            del self._entries[key]
@@ -0,0 +1,50 @@
+# Distance lookups over institute locations ("colleges near me").
+# The unique institutes with coordinates go into a BallTree with the haversine metric once per dataset, so a radius
+# or k-nearest query from a home location is a tree search over ~100 points instead of a distance per table row.
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+def to_radians(latitude, longitude):
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError(f"invalid location ({latitude}, {longitude})")
+    return np.radians([[latitude, longitude]])
+
+
+class SpatialIndex:
+    """
+    Great-circle distances from a point to the institutes of a table (one location per institute).
+    Results are [(institute, distance in km)], nearest first.
+    """
+
+    def __init__(self, df, name_column='Institute', latitude_column='Latitude', longitude_column='Longitude'):
+        located = df[[name_column, latitude_column, longitude_column]].dropna().drop_duplicates(name_column)
+        self.names = np.array(located[name_column].astype(str).tolist(), dtype=object)
+        self.coordinates = located[[latitude_column, longitude_column]].to_numpy(dtype=np.float64)
+        self.tree = BallTree(np.radians(self.coordinates), metric='haversine')
+
+    def results(self, positions, distances):
+        return list(zip(self.names[positions].tolist(), (distances * EARTH_RADIUS_KM).tolist()))
+
+    def within(self, latitude, longitude, radius_km):
+        """Institutes at most `radius_km` away."""
+        positions, distances = self.tree.query_radius(to_radians(latitude, longitude), r=radius_km / EARTH_RADIUS_KM,
+                                                      return_distance=True, sort_results=True)
+        return self.results(positions[0], distances[0])
+
+    def nearest(self, latitude, longitude, k):
+        """The `k` nearest institutes (all of them if there are fewer)."""
+        k = min(int(k), len(self.names))
+        if k <= 0:
+            return []
+        distances, positions = self.tree.query(to_radians(latitude, longitude), k=k)
+        return self.results(positions[0], distances[0])
+
+    def search(self, latitude, longitude, radius_km=None, k=None):
+        """within() and/or nearest(): the k nearest inside the radius when both are given, every institute if neither."""
+        if radius_km is None:
+            return self.nearest(latitude, longitude, len(self.names) if k is None else k)
+        found = self.within(latitude, longitude, radius_km)
+        return found if k is None else found[:max(int(k), 0)]
@@ -0,0 +1,149 @@
+# Disk-backed key-value docstore for the JEE Docs Chat parent documents.
+# Drop-in replacement for InMemoryStore in the MultiVectorRetriever: documents stay in a SQLite file
+# and only the doc_ids returned by the vector search are read, so resident memory does not grow with
+# the corpus and several worker processes share the OS page cache instead of holding private copies.
+# The same file holds an FTS5 index of the documents' BM25 terms, so hybrid retrieval in disk mode searches on disk
+# too instead of loading every document to build its inverted index in memory.
+
+from langchain_core.stores import BaseStore
+
+import os
+import json
+import sqlite3
+import threading
+
+from src.hybrid_retriever import tokenize
+
+# FTS5 table of each document's terms as hybrid_retriever.tokenize() produces them (compound tokens such as
+# "gen-ews" plus their parts); '-', '/' and '.' are token characters so the compounds stay whole. Its rowids are
+# those of the docs table, and it is contentless: the text is only needed for matching.
+LEXICAL_TABLE = "CREATE VIRTUAL TABLE lexical USING fts5(terms, content='', tokenize=\"unicode61 tokenchars '-/.'\")"
+
+class SQLiteDocStore(BaseStore[str, object]):
+    """
+    BaseStore over a single SQLite table (doc_id -> JSON-encoded document).
+    Each thread gets its own connection, so one store can be shared by every Streamlit session.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS docs (doc_id TEXT PRIMARY KEY, content TEXT NOT NULL)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def mget(self, keys):
+        if not keys:
+            return []
+        placeholders = ",".join("?" for _ in keys)
+        rows = self._conn().execute(
+            f"SELECT doc_id, content FROM docs WHERE doc_id IN ({placeholders})", list(keys)
+        ).fetchall()
+        found = {doc_id: json.loads(content) for doc_id, content in rows}
+        return [found.get(key) for key in keys]
+
+    def mset(self, key_value_pairs):
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO docs (doc_id, content) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in key_value_pairs],
+        )
+        conn.commit()
+
+    def mdelete(self, keys):
+        conn = self._conn()
+        conn.executemany("DELETE FROM docs WHERE doc_id = ?", [(key,) for key in keys])
+        conn.commit()
+
+    def yield_keys(self, prefix=None):
+        if prefix is None:
+            cursor = self._conn().execute("SELECT doc_id FROM docs")
+        else:
+            cursor = self._conn().execute("SELECT doc_id FROM docs WHERE doc_id LIKE ? || '%'", (prefix,))
+        for (doc_id,) in cursor:
+            yield doc_id
+
+
+class SQLiteLexicalIndex:
+    """BM25 search over the lexical table of a docstore built by build_from_json(); same interface as BM25Index."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def search(self, query, k):
+        """Return up to k (doc_id, score) pairs, best first (score is FTS5's bm25(), negated so higher is better)."""
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        # Tokens only contain [a-z0-9-/.], so quoting each one is enough to keep FTS5 from parsing it as syntax
+        match = " OR ".join(f'"{term}"' for term in terms)
+        rows = self._conn().execute(
+            "SELECT docs.doc_id, -bm25(lexical) FROM lexical JOIN docs ON docs.rowid = lexical.rowid "
+            "WHERE lexical MATCH ? ORDER BY bm25(lexical) LIMIT ?", (match, k)
+        ).fetchall()
+        return [(doc_id, float(score)) for doc_id, score in rows]
+
+
+def source_signature(json_path):
+    """(mtime in ns, size) of the JSON docstore, recorded in the SQLite file it was converted into."""
+    stat = os.stat(json_path)
+    return stat.st_mtime_ns, stat.st_size
+
+def is_current(json_path, db_path):
+    """True if db_path exists and was built from the JSON docstore as it is now (not an older or newer version)."""
+    if not os.path.exists(db_path):
+        return False
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT json_mtime_ns, json_size FROM source").fetchone()
+        has_lexical = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'lexical'").fetchone() is not None
+    except sqlite3.Error:
+        row = None      # built before the source was recorded
+    finally:
+        conn.close()
+    return row is not None and has_lexical and tuple(row) == source_signature(json_path)
+
+def build_from_json(json_path, db_path):
+    """
+    Convert a JSON docstore ({doc_id: document}) into a SQLite docstore at db_path.
+    The file is written next to the target and moved into place, so readers never see a half-built store.
+    """
+    # Taken before reading, so a JSON rewritten meanwhile leaves a mismatch and is converted again next time
+    signature = source_signature(json_path)
+    with open(json_path, "r") as f:
+        doc_data = json.load(f)
+
+    tmp_path = f"{db_path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("CREATE TABLE docs (doc_id TEXT PRIMARY KEY, content TEXT NOT NULL)")
+    conn.executemany(
+        "INSERT INTO docs (rowid, doc_id, content) VALUES (?, ?, ?)",
+        [(rowid, doc_id, json.dumps(doc)) for rowid, (doc_id, doc) in enumerate(doc_data.items(), start=1)],
+    )
+    conn.execute(LEXICAL_TABLE)
+    conn.executemany(
+        "INSERT INTO lexical (rowid, terms) VALUES (?, ?)",
+        [(rowid, " ".join(tokenize(str(doc)))) for rowid, doc in enumerate(doc_data.values(), start=1)],
+    )
+    conn.execute("CREATE TABLE source (json_mtime_ns INTEGER NOT NULL, json_size INTEGER NOT NULL)")
+    conn.execute("INSERT INTO source (json_mtime_ns, json_size) VALUES (?, ?)", signature)
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, db_path)
@@ -0,0 +1,30 @@
+# Helpers for streaming LLM output into the Streamlit pages with st.write_stream.
+# timed_stream() passes text chunks through unchanged and records time-to-first-token and total time,
+# so the perceived latency of every page can be checked without touching the LLM calls themselves.
+
+from collections import defaultdict, deque
+
+import time
+
+# label -> recent {"ttft_s", "total_s"} measurements (bounded per label)
+stream_stats = defaultdict(lambda: deque(maxlen=200))
+
+def chunk_text(chunks):
+    """Yield the text of message chunks from llm.stream() / chain.stream()."""
+    for chunk in chunks:
+        content = getattr(chunk, "content", chunk)
+        if content:
+            yield content
+
+def timed_stream(label, chunks):
+    """Yield text chunks, recording time-to-first-token and total streaming time under `label`."""
+    start = time.perf_counter()
+    ttft = None
+    for text in chunk_text(chunks):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        yield text
+    total = time.perf_counter() - start
+    ttft = total if ttft is None else ttft
+    stream_stats[label].append({"ttft_s": ttft, "total_s": total})
+    print(f"{label}: time to first token {ttft:.3f}s, total {total:.3f}s")
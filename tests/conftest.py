@@ -0,0 +1,116 @@
+# Shared fixtures: a synthetic cutoff table (with missing categorical keys and missing cutoffs, like the real one)
+# and the plain pandas filter that the indexes must agree with.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import data_store
+from src.cutoff_index import ELIGIBILITY_BOUNDS
+
+# institute -> (category, latitude, longitude)
+INSTITUTES = {
+    'IIT Alpha': ('IIT', 19.13, 72.91),
+    'IIT Beta': ('IIT', 28.55, 77.19),
+    'NIT Gamma': ('NIT', 10.76, 78.81),
+    'NIT Delta': ('NIT', 13.01, 74.79),
+    'NIT Epsilon': ('NIT', 26.19, 91.69),
+    'IIIT Zeta': ('IIIT', 17.44, 78.35),
+}
+BRANCHES = {
+    'Computer Science and Engineering': 'Computer Science',
+    'Electrical Engineering': 'Electrical',
+    'Mechanical Engineering': 'Mechanical',
+    'Civil Engineering': 'Civil',
+}
+
+def synthetic_cutoffs(num_rows=2000, seed=0):
+    """A typed table with the cutoff dataset's columns; ~5% missing Quota / Seat Type / Gender, ~20% missing cutoffs."""
+    rng = np.random.default_rng(seed)
+
+    def pick(values, missing=0.0):
+        chosen = rng.choice(list(values), num_rows).astype(object)
+        chosen[rng.random(num_rows) < missing] = None
+        return chosen
+
+    institutes = pick(INSTITUTES)
+    branches = pick(BRANCHES)
+    df = pd.DataFrame({
+        'Institute': institutes,
+        'College Category': [INSTITUTES[name][0] for name in institutes],
+        'Program Code': rng.integers(4000, 5000, num_rows),
+        'Branch Cluster': [BRANCHES[name] for name in branches],
+        'Degree': pick(['B.Tech', 'Dual Degree']),
+        'Branch Name': branches,
+        'Degree Duration': pick(['4 Years', '5 Years']),
+        'Seat Capacity (w.r.t. Quota)': rng.integers(1, 100, num_rows),
+        'Aggregated Seats': rng.integers(1, 200, num_rows),
+        'Quota': pick(['AI', 'HS', 'OS'], missing=0.05),
+        'Seat Type': pick(['OPEN', 'OBC-NCL', 'SC'], missing=0.05),
+        'Gender': pick(['Gender-Neutral', 'Female-only'], missing=0.05),
+        'View Details': [f"https://example.org/{code}" for code in range(num_rows)],
+        'Latitude': [INSTITUTES[name][1] for name in institutes],
+        'Longitude': [INSTITUTES[name][2] for name in institutes],
+    })
+    for exam in ('Mains', 'Advanced'):
+        opening = rng.integers(1, 50000, num_rows).astype(np.float64)
+        closing = opening + rng.integers(0, 5000, num_rows)
+        opening_marks = rng.uniform(40, 99, num_rows).round(2)
+        closing_marks = (opening_marks - rng.uniform(0, 10, num_rows)).round(2)
+        missing = rng.random(num_rows) < 0.2
+        for column, values in ((f'Opening Rank ({exam})', opening), (f'Closing Rank ({exam})', closing),
+                               (f'Opening Marks ({exam})', opening_marks), (f'Closing Marks ({exam})', closing_marks)):
+            df[column] = np.where(missing, np.nan, values)
+        df[f'Rank Range ({exam})'] = [f"{a:.0f} - {b:.0f}" for a, b in zip(opening, closing)]
+        df[f'Score Range ({exam})'] = [f"{a} - {b}" for a, b in zip(opening_marks, closing_marks)]
+    for column in data_store.DATASETS['cutoffs']['categorical']:
+        df[column] = df[column].astype('category')
+    return df
+
+def scan_filter(df, selections, **bounds):
+    """
+    Row positions the original page filter keeps: isin() on every selected column ('All' or None: no filter), and
+    for each rank/marks bound the student clears the cutoff or the cutoff is missing.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column, values in selections.items():
+        if values is not None and 'All' not in values:
+            mask &= df[column].isin(values).to_numpy()
+    for column, (argument, upper) in ELIGIBILITY_BOUNDS.items():
+        bound = bounds.get(argument)
+        if bound is None:
+            continue
+        cutoff = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            mask &= (cutoff >= bound if upper else cutoff <= bound) | np.isnan(cutoff)
+    return np.flatnonzero(mask)
+
+def random_selection(rng, df, column):
+    """['All'], or one to three of the column's values (sometimes including one the table does not have)."""
+    if rng.random() < 0.4:
+        return ['All']
+    values = list(df[column].cat.categories)
+    chosen = list(rng.choice(values, size=min(len(values), rng.integers(1, 4)), replace=False))
+    if rng.random() < 0.1:
+        chosen.append('Not In Table')
+    return chosen
+
+def random_bounds(rng):
+    """Random rank/marks arguments, each left out (None) half of the time."""
+    return {
+        'rank_mains': float(rng.integers(1, 55000)) if rng.random() < 0.5 else None,
+        'rank_adv': float(rng.integers(1, 55000)) if rng.random() < 0.5 else None,
+        'score_mains': float(rng.uniform(30, 100)) if rng.random() < 0.5 else None,
+        'score_adv': float(rng.uniform(30, 100)) if rng.random() < 0.5 else None,
+    }
+
+@pytest.fixture
+def cutoff_frame():
+    return synthetic_cutoffs()
+
+@pytest.fixture
+def installed_cutoffs(monkeypatch, cutoff_frame):
+    """The synthetic table served by data_store as the 'cutoffs' dataset, with fresh derived indexes."""
+    monkeypatch.setitem(data_store._frames, 'cutoffs', cutoff_frame)
+    monkeypatch.setattr(data_store, '_derived', {})
+    return cutoff_frame
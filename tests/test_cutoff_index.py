@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.cutoff_index import INDEXED_COLUMNS, RANK_PARTITION_COLUMNS, CategoricalIndex, RankIndex
+
+from tests.conftest import random_bounds, random_selection, scan_filter
+
+def test_categorical_index_matches_scan(cutoff_frame):
+    index = CategoricalIndex(cutoff_frame)
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        selections = {column: random_selection(rng, cutoff_frame, column) for column in INDEXED_COLUMNS}
+        np.testing.assert_array_equal(index.filter_rows(selections), scan_filter(cutoff_frame, selections))
+
+def test_rank_index_matches_scan(cutoff_frame):
+    index = RankIndex(cutoff_frame)
+    rng = np.random.default_rng(1)
+    for _ in range(300):
+        selections = {column: random_selection(rng, cutoff_frame, column) for column in RANK_PARTITION_COLUMNS}
+        bounds = random_bounds(rng)
+        np.testing.assert_array_equal(index.eligible_rows(selections, **bounds),
+                                      scan_filter(cutoff_frame, selections, **bounds))
+
+def test_rank_index_keeps_rows_with_missing_partition_keys(cutoff_frame):
+    index = RankIndex(cutoff_frame)
+    missing = np.flatnonzero(cutoff_frame[RANK_PARTITION_COLUMNS].isna().any(axis=1).to_numpy())
+    assert len(missing)
+
+    everything = {column: ['All'] for column in RANK_PARTITION_COLUMNS}
+    assert np.isin(missing, index.eligible_rows(everything)).all()
+    assert len(index.eligible_rows(everything)) == len(cutoff_frame)
+
+    # A specific selection on a column never matches the rows missing that column
+    quotas = {**everything, 'Quota': ['AI', 'HS', 'OS']}
+    no_quota = np.flatnonzero(cutoff_frame['Quota'].isna().to_numpy())
+    assert not np.isin(no_quota, index.eligible_rows(quotas)).any()
@@ -0,0 +1,130 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from src.cutoff_index import safety_margin
+from src.cutoff_query import FilterSpec, QueryHandler, batch_match, match
+from src.spatial_index import EARTH_RADIUS_KM
+
+from tests.conftest import INSTITUTES, random_bounds, random_selection, scan_filter
+
+# FilterSpec field -> table column
+SELECTION_FIELDS = {'institutes': 'Institute', 'college_categories': 'College Category', 'degrees': 'Degree',
+                    'branch_clusters': 'Branch Cluster', 'branches': 'Branch Name', 'quotas': 'Quota',
+                    'seat_types': 'Seat Type', 'genders': 'Gender'}
+
+def random_spec(rng, df):
+    """A FilterSpec with random selections and bounds, and a radius and/or nearest filter a third of the time."""
+    spec = {field: random_selection(rng, df, column) for field, column in SELECTION_FIELDS.items()}
+    spec.update(random_bounds(rng))
+    if rng.random() < 0.33:
+        spec.update(home_latitude=float(rng.uniform(10, 30)), home_longitude=float(rng.uniform(70, 92)))
+        if rng.random() < 0.5:
+            spec['radius_km'] = float(rng.uniform(100, 2000))
+        if rng.random() < 0.5:
+            spec['nearest'] = int(rng.integers(1, len(INSTITUTES) + 1))
+    return FilterSpec(**spec)
+
+def haversine_km(latitude, longitude, other_latitude, other_longitude):
+    lat1, lon1, lat2, lon2 = np.radians([latitude, longitude, other_latitude, other_longitude])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def scan_match(df, spec):
+    """Row positions matching `spec` by brute force: scan_filter() plus a distance to every institute."""
+    rows = scan_filter(df, spec.selections(), **spec.bounds())
+    if spec.location() is None:
+        return rows
+    distances = sorted((haversine_km(spec.home_latitude, spec.home_longitude, latitude, longitude), name)
+                       for name, (_, latitude, longitude) in INSTITUTES.items())
+    if spec.radius_km is not None:
+        distances = [(km, name) for km, name in distances if km <= spec.radius_km]
+    if spec.nearest is not None:
+        distances = distances[:spec.nearest]
+    allowed = [name for _, name in distances]
+    return rows[np.isin(df['Institute'].to_numpy(dtype=object)[rows], allowed)]
+
+def scan_margin(df, rows, spec):
+    margins = [safety_margin(df[f'Closing Rank ({exam})'].to_numpy()[rows], rank)
+               for exam, rank in (('Mains', spec.rank_mains), ('Advanced', spec.rank_adv)) if rank is not None]
+    return np.fmin.reduce(margins) if margins else np.full(len(rows), np.nan)
+
+def test_match_matches_scan(installed_cutoffs):
+    df = installed_cutoffs
+    rng = np.random.default_rng(2)
+    for _ in range(200):
+        spec = random_spec(rng, df)
+        rows, margin = match(spec)
+        expected = scan_match(df, spec)
+        np.testing.assert_array_equal(np.sort(rows), expected)
+
+        # Safest first, programs without a margin last
+        np.testing.assert_allclose(margin, scan_margin(df, rows, spec))
+        known = margin[~np.isnan(margin)]
+        assert (np.diff(known) <= 0).all()
+        assert np.isnan(margin[len(known):]).all()
+
+def test_batch_match_matches_match(installed_cutoffs):
+    df = installed_cutoffs
+    rng = np.random.default_rng(3)
+    specs = [random_spec(rng, df) for _ in range(40)]
+    # Profiles sharing their categorical filters take the grouped path together
+    specs += [spec.model_copy(update=random_bounds(rng)) for spec in specs[:20]]
+    counts, top_rows, top_margins = batch_match(specs, top_k=7)
+    for spec, count, picked, picked_margins in zip(specs, counts, top_rows, top_margins):
+        rows, margin = match(spec)
+        assert count == len(rows)
+        found = min(len(rows), 7)
+        np.testing.assert_array_equal(picked[:found], rows[:found])
+        np.testing.assert_allclose(picked_margins[:found], margin[:found])
+        assert (picked[found:] == -1).all()
+
+
+@pytest.fixture
+def server(installed_cutoffs):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), QueryHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"), method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+@pytest.mark.parametrize("path, body", [
+    ("/query", {"limit": "2"}),
+    ("/query", {"limit": 0}),
+    ("/query", {"offset": -1}),
+    ("/query", {"sort_by": "Not A Column"}),
+    ("/query", {"columns": ["Not A Column"]}),
+    ("/query", {"descending": "yes"}),
+    ("/query", {"filters": {"radius_km": 50}}),
+    ("/batch", {"profiles": [{}], "top_k": -1}),
+    ("/batch", {"profiles": [{}], "trend_exam": "JEE"}),
+    ("/trend", {"exam": "JEE"}),
+    ("/trend", {"limit": -5}),
+])
+def test_invalid_request_is_rejected(server, path, body):
+    status, payload = post(server + path, body)
+    assert status == 400
+    assert "error" in payload
+
+def test_query_endpoint(server):
+    status, payload = post(server + "/query", {"filters": {"rank_adv": 20000}, "limit": 5, "offset": 2,
+                                              "columns": ["Institute", "Closing Rank (Advanced)"]})
+    assert status == 200
+    rows, _ = match(FilterSpec(rank_adv=20000))
+    assert payload["summary"]["programs"] == len(rows)
+    assert len(payload["programs"]) == 5
+    assert set(payload["programs"][0]) == {"Institute", "Closing Rank (Advanced)"}
@@ -0,0 +1,62 @@
+import pytest
+
+from src import response_cache
+from src.response_cache import ResponseCache
+
+class Clock:
+    """Stand-in for time.time() that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+class EchoLLM:
+    model_name = 'echo'
+    temperature = 0.0
+
+    def __init__(self):
+        self.calls = []
+
+    def invoke(self, messages):
+        self.calls.append(messages[1]['content'])
+        return type('Response', (), {'content': f"answer to {messages[1]['content']}"})()
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, 'time', clock)
+    return clock
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), ttl=60)
+    cache.put('a', 'first')
+    clock.now += 59
+    assert cache.contains('a') and cache.get('a') == 'first'
+    clock.now += 2
+    assert not cache.contains('a')
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), max_bytes=10)
+    cache.put('a', 'aaaa')
+    clock.now += 1
+    cache.put('b', 'bbbb')
+    clock.now += 1
+    assert cache.get('a') == 'aaaa'  # now more recently used than 'b'
+    clock.now += 1
+    cache.put('c', 'cccc')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'aaaa' and cache.get('c') == 'cccc'
+    assert cache.stats()['bytes'] <= 10
+
+def test_key_input_shares_an_entry_but_the_llm_gets_the_typed_input(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+    llm = EchoLLM()
+    first = cache.generate(llm, 'system', 'Tell me about CSE', key_input='Computer Science')
+    second = cache.generate(llm, 'system', 'cse', key_input='Computer Science')
+    assert first == second == 'answer to Tell me about CSE'
+    assert llm.calls == ['Tell me about CSE']
+    assert cache.stats()['hits'] == 1